@@ -0,0 +1,261 @@
+# accounts.py
+import os
+import json
+import time
+import threading
+from googleapiclient.http import HttpRequest
+from googleapiclient.errors import HttpError
+from drive_auth import authenticate_drive
+from logger_utils import setup_logger
+import metrics
+from paths import get_account_quota_file
+
+# --- Initialisation logging robuste ---
+accounts_logger = setup_logger("accounts", "accounts.log")
+accounts_logger.info("=== Accounts logger initialisé ===")
+
+PRIMARY_ACCOUNT = "default"
+DAILY_UPLOAD_LIMIT = 750 * 1024 ** 3     # plafond Drive d'envoi par utilisateur et par jour
+REQUESTS_PER_SECOND = 10                 # limite locale par compte, sous le quota par utilisateur
+BURST = 20
+RATE_LIMIT_COOLDOWN = 60                 # pause après un userRateLimitExceeded (secondes)
+QUOTA_COOLDOWN = 3600                    # pause après un dépassement de quota journalier
+
+RATE_LIMIT_REASONS = {"userRateLimitExceeded", "rateLimitExceeded"}
+QUOTA_REASONS = {"dailyLimitExceeded", "quotaExceeded", "uploadLimitExceeded", "storageQuotaExceeded"}
+
+
+def quota_error_reason(error):
+    """Raison du refus si l'erreur est un dépassement de quota Drive, sinon None."""
+    if not isinstance(error, HttpError) or error.resp.status not in (403, 429):
+        return None
+    for detail in getattr(error, "error_details", None) or []:
+        reason = detail.get("reason") if isinstance(detail, dict) else None
+        if reason in RATE_LIMIT_REASONS | QUOTA_REASONS:
+            return reason
+    content = error.content.decode("utf-8", "ignore") if isinstance(error.content, bytes) else str(error.content)
+    for reason in RATE_LIMIT_REASONS | QUOTA_REASONS:
+        if reason in content:
+            return reason
+    return "rateLimitExceeded" if error.resp.status == 429 else None
+
+
+class TokenBucket:
+    """Limiteur de débit de requêtes (seau à jetons)."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def rate_limited_request_builder(limiter):
+    """Classe HttpRequest dont chaque appel réseau consomme un jeton du compte."""
+
+    class RateLimitedRequest(HttpRequest):
+        def execute(self, *args, **kwargs):
+            limiter.acquire()
+            return super().execute(*args, **kwargs)
+
+        def next_chunk(self, *args, **kwargs):
+            limiter.acquire()
+            return super().next_chunk(*args, **kwargs)
+
+    return RateLimitedRequest
+
+
+class DriveAccount:
+    def __init__(self, name, usage):
+        self.name = name
+        self.limiter = TokenBucket(REQUESTS_PER_SECOND, BURST)
+        self.bytes_today = usage.get("bytes", 0) if usage.get("day") == time.strftime("%Y-%m-%d") else 0
+        self.shared_folders = set(usage.get("shared_folders", []))
+        self.cooldown_until = 0
+        self.email = usage.get("email")
+        self._service = None
+        self._local = threading.local()
+
+    def _authenticate(self):
+        # Compte supplémentaire : jamais de flux OAuth interactif dans le service, où personne
+        # ne peut le terminer ; un jeton invalide lève AuthorizationRequired
+        return authenticate_drive(self.name, rate_limited_request_builder(self.limiter),
+                                  interactive=self.name == PRIMARY_ACCOUNT)
+
+    @property
+    def service(self):
+        if self._service is None:
+            self._service = self._authenticate()
+        return self._service
+
+    def thread_service(self):
+        """Client propre au thread appelant (httplib2 n'est pas thread-safe), même limiteur de débit."""
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = self._local.service = self._authenticate()
+        return service
+
+    def available(self):
+        return time.time() >= self.cooldown_until
+
+    def headroom(self):
+        return DAILY_UPLOAD_LIMIT - self.bytes_today
+
+    def describe(self):
+        state = "" if self.available() else " (en pause)"
+        return f"{self.name} {self.bytes_today / 1024 ** 3:.1f} Go{state}"
+
+
+class AccountPool:
+    """Répartit les envois entre plusieurs comptes Drive autorisés selon leur marge de quota.
+
+    Le compte principal (token.pickle) possède l'arborescence de dossiers et effectue les
+    opérations de métadonnées ; les comptes supplémentaires y reçoivent un accès en écriture
+    avant tout envoi. Un fichier déjà envoyé reste traité par le compte qui l'a créé.
+    """
+
+    def __init__(self, quota_file):
+        self.quota_file = quota_file
+        self._lock = threading.Lock()
+        self.day = time.strftime("%Y-%m-%d")
+        self.accounts = {}
+        self.configure([])
+
+    def _load_usage(self):
+        try:
+            if os.path.exists(self.quota_file):
+                with open(self.quota_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            accounts_logger.error(f"Erreur lors du chargement des quotas : {e}")
+        return {}
+
+    def _save_usage(self):
+        data = {name: {"day": self.day, "bytes": account.bytes_today, "email": account.email,
+                       "shared_folders": sorted(account.shared_folders)}
+                for name, account in self.accounts.items()}
+        try:
+            with open(self.quota_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+        except IOError as e:
+            accounts_logger.error(f"Erreur lors de la sauvegarde des quotas : {e}")
+
+    def configure(self, names):
+        """(Re)définit les comptes : le compte principal plus ceux de config['accounts']."""
+        usage = self._load_usage()
+        with self._lock:
+            wanted = [PRIMARY_ACCOUNT] + [n for n in names if n and n != PRIMARY_ACCOUNT]
+            self.accounts = {name: self.accounts.get(name) or DriveAccount(name, usage.get(name, {}))
+                             for name in wanted}
+            for account in self.accounts.values():
+                if account.cooldown_until == float("inf"):
+                    account.cooldown_until = 0
+        if len(wanted) > 1:
+            accounts_logger.info(f"Comptes Drive actifs : {', '.join(wanted)}")
+        metrics.register_gauge("accounts", lambda: ", ".join(a.describe() for a in self.accounts.values()))
+
+    @property
+    def primary(self):
+        return self.accounts[PRIMARY_ACCOUNT]
+
+    def _roll_day(self):
+        today = time.strftime("%Y-%m-%d")
+        if today != self.day:
+            self.day = today
+            for account in self.accounts.values():
+                account.bytes_today = 0
+
+    def owner_of(self, entry):
+        """Compte qui a créé le fichier Drive d'une entrée d'index ou du ledger."""
+        name = (entry or {}).get("account") or PRIMARY_ACCOUNT
+        account = self.accounts.get(name)
+        if account is None:
+            accounts_logger.warning(f"Compte {name} retiré de la configuration, utilisation du compte principal")
+            return self.primary
+        return account
+
+    def next_available(self):
+        """Instant (time.time) à partir duquel au moins un compte sort de pause."""
+        with self._lock:
+            return min(account.cooldown_until for account in self.accounts.values())
+
+    def disable(self, account, reason):
+        """Compte inutilisable (autorisation, dossier partagé) : écarté jusqu'à reconfiguration."""
+        with self._lock:
+            account.cooldown_until = float("inf")
+        accounts_logger.error(f"Compte {account.name} écarté : {reason}. Vérifiez l'autorisation de ce compte.")
+        metrics.record_event("quota", account.name, message=f"compte écarté : {reason}")
+
+    def disable_unauthorized(self, error):
+        """Compte sans jeton valide (AuthorizationRequired) : écarté.
+
+        Retourne True s'il vient de l'être (un autre compte peut prendre le relais), False s'il
+        l'était déjà : le fichier doit alors attendre la reconfiguration.
+        """
+        account = self.accounts.get(error.account)
+        if account is None or account is self.primary or not account.available():
+            return False
+        self.disable(account, f"non autorisé ({error.reason})")
+        return True
+
+    def choose(self, size):
+        """Compte disponible ayant la plus grande marge pour `size` octets, sinon None."""
+        with self._lock:
+            self._roll_day()
+            candidates = [a for a in self.accounts.values() if a.available() and a.headroom() >= size]
+            if not candidates:
+                return None
+            return max(candidates, key=lambda a: a.headroom())
+
+    def record_upload(self, account, size):
+        with self._lock:
+            self._roll_day()
+            account.bytes_today += size
+            self._save_usage()
+        metrics.inc_counter(f"account_{account.name}_bytes", size)
+
+    def record_quota_error(self, account, error):
+        """Met le compte en pause. Retourne True si un autre compte peut prendre le relais."""
+        reason = quota_error_reason(error)
+        cooldown = RATE_LIMIT_COOLDOWN if reason in RATE_LIMIT_REASONS else QUOTA_COOLDOWN
+        with self._lock:
+            account.cooldown_until = time.time() + cooldown
+            others = [a for a in self.accounts.values() if a is not account and a.available()]
+        accounts_logger.warning(f"Quota atteint pour le compte {account.name} ({reason}), pause de {cooldown}s")
+        metrics.inc_counter(f"account_{account.name}_quota_errors")
+        metrics.record_event("quota", account.name, message=f"{reason}, pause de {cooldown}s")
+        return bool(others)
+
+    def ensure_shared(self, account, folder_id):
+        """Donne au compte un accès en écriture au dossier racine du compte principal."""
+        if account is self.primary or folder_id in account.shared_folders:
+            return
+        if not account.email:
+            about = account.service.about().get(fields='user(emailAddress)').execute()
+            account.email = about['user']['emailAddress']
+        self.primary.service.permissions().create(
+            fileId=folder_id,
+            body={'type': 'user', 'role': 'writer', 'emailAddress': account.email},
+            sendNotificationEmail=False,
+            fields='id'
+        ).execute()
+        with self._lock:
+            account.shared_folders.add(folder_id)
+            self._save_usage()
+        accounts_logger.info(f"Dossier {folder_id} partagé en écriture avec le compte {account.name} ({account.email})")
+
+
+account_pool = AccountPool(get_account_quota_file())
@@ -0,0 +1,151 @@
+# benchmark_upload.py
+"""Compare l'ancienne stratégie d'envoi (resumable, chunk par défaut) à la stratégie adaptative.
+
+Usage : python benchmark_upload.py [--sizes 64K,1M,4M,16M,64M,256M] [--repeat 3] [--json resultats.json]
+        python benchmark_upload.py --fake [--rtt 0.08] [--bandwidth 4M] ...
+
+Les fichiers de test sont envoyés dans un dossier « AudioDriveSync-benchmark » à la racine
+du Drive du compte autorisé, puis supprimés. Avec --fake, ils partent vers le faux Drive du
+test d'endurance (soak_harness.FakeDrive), dont le RTT et le débit sont fixés : aucun compte
+n'est nécessaire et les résultats sont reproductibles.
+
+Les deux stratégies alternent à chaque répétition, et seuls les envois adaptatifs alimentent
+l'estimateur du lien : la taille de chunk relevée est celle réellement utilisée par chaque envoi.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from googleapiclient.http import MediaFileUpload
+from drive_auth import authenticate_drive
+from uploader import build_media, execute_upload, link_stats
+
+BENCH_FOLDER = "AudioDriveSync-benchmark"
+UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def legacy_media(file_path):
+    return MediaFileUpload(file_path, resumable=True)
+
+
+def legacy_execute(request, file_path):
+    # Ancien envoi : request.execute(), sans mesure du lien (n'entraîne pas l'estimateur adaptatif)
+    return request.execute()
+
+
+STRATEGIES = {
+    "resumable_defaut": (legacy_media, legacy_execute),
+    "adaptatif": (build_media, execute_upload),
+}
+
+
+def get_bench_folder(service):
+    results = service.files().list(
+        q=f"'root' in parents and name='{BENCH_FOLDER}' and mimeType='application/vnd.google-apps.folder' and trashed=false",
+        spaces='drive',
+        fields='files(id)'
+    ).execute()
+    files = results.get('files', [])
+    if files:
+        return files[0]['id']
+    folder = service.files().create(
+        body={'name': BENCH_FOLDER, 'mimeType': 'application/vnd.google-apps.folder', 'parents': ['root']},
+        fields='id'
+    ).execute()
+    return folder['id']
+
+
+def timed_upload(service, folder_id, file_path, media_factory, executor):
+    """Durée de l'envoi et taille de chunk utilisée (None pour un envoi multipart)."""
+    media = media_factory(file_path)
+    request = service.files().create(
+        body={'name': os.path.basename(file_path), 'parents': [folder_id]},
+        media_body=media,
+        fields='id'
+    )
+    start = time.perf_counter()
+    response = executor(request, file_path)
+    elapsed = time.perf_counter() - start
+    service.files().delete(fileId=response['id']).execute()
+    return elapsed, media.chunksize() if media.resumable() else None
+
+
+def format_chunks(chunks):
+    sizes = sorted({c for c in chunks if c})
+    return f"chunk {'/'.join(str(c // 1024) for c in sizes)} Ko" if sizes else "multipart"
+
+
+def run(service, sizes, repeat):
+    folder_id = get_bench_folder(service)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            file_path = os.path.join(tmp, f"bench_{size}.bin")
+            with open(file_path, 'wb') as f:
+                remaining = size
+                while remaining:
+                    block = os.urandom(min(remaining, 4 * 1024 * 1024))
+                    f.write(block)
+                    remaining -= len(block)
+
+            timings = {name: [] for name in STRATEGIES}
+            chunks = []
+            for i in range(repeat):
+                # Ordre alterné : aucune stratégie ne profite systématiquement de la précédente
+                order = list(STRATEGIES) if i % 2 == 0 else list(reversed(STRATEGIES))
+                for name in order:
+                    elapsed, chunk = timed_upload(service, folder_id, file_path, *STRATEGIES[name])
+                    timings[name].append(elapsed)
+                    if name == "adaptatif":
+                        chunks.append(chunk)
+
+            row = {"size": size}
+            for name, values in timings.items():
+                row[name] = statistics.median(values)
+            row["chunk_sizes"] = chunks
+            row["gain_pct"] = 100 * (row["resumable_defaut"] - row["adaptatif"]) / row["resumable_defaut"]
+            results.append(row)
+            print(f"{size / 1024 / 1024:10.2f} Mo  défaut {row['resumable_defaut']:8.3f}s  "
+                  f"adaptatif {row['adaptatif']:8.3f}s  gain {row['gain_pct']:6.1f} %  {format_chunks(chunks)}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="64K,512K,2M,8M,32M,128M")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="fichier de sortie JSON pour comparer plusieurs exécutions")
+    parser.add_argument("--fake", action="store_true", help="faux Drive local au lieu du compte autorisé")
+    parser.add_argument("--rtt", type=float, default=0.08, help="RTT simulé du faux Drive (s)")
+    parser.add_argument("--bandwidth", type=parse_size, default=4 * UNITS["M"], help="débit simulé (octets/s)")
+    args = parser.parse_args()
+
+    if args.fake:
+        from soak_harness import FakeDrive, FakeDriveService
+        service = FakeDriveService(FakeDrive(args.rtt, args.bandwidth))
+        link = {"mode": "fake", "rtt": args.rtt, "bandwidth": args.bandwidth}
+    else:
+        service = authenticate_drive()
+        link = {"mode": "drive"}
+
+    results = run(service, [parse_size(s) for s in args.sizes.split(",")], args.repeat)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(dict(link, date=time.strftime("%Y-%m-%d %H:%M:%S"), repeat=args.repeat,
+                           measured_rtt=link_stats.rtt, measured_throughput=link_stats.throughput,
+                           results=results), f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
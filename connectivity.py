@@ -0,0 +1,242 @@
+# connectivity.py
+import os
+import json
+import time
+import socket
+import threading
+import http.client
+import httplib2
+from googleapiclient.errors import HttpError
+from google.auth.exceptions import TransportError
+from logger_utils import setup_logger
+import metrics
+from paths import get_spool_file
+
+# --- Initialisation logging robuste ---
+connectivity_logger = setup_logger("connectivity", "connectivity.log")
+connectivity_logger.info("=== Connectivity logger initialisé ===")
+
+PROBE_HOST = ("www.googleapis.com", 443)
+PROBE_TIMEOUT = 5
+FAILURE_THRESHOLD = 3       # échecs réseau consécutifs avant ouverture du disjoncteur
+RESET_TIMEOUT = 30          # délai avant la première sonde (secondes)
+MAX_RESET_TIMEOUT = 600
+DRAIN_INTERVAL = 5          # secondes entre deux envois lors de la vidange du spool
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_connectivity_error(error):
+    """True si l'erreur traduit une panne réseau ou Google, et non un problème du fichier."""
+    if isinstance(error, HttpError):
+        return error.resp.status == 429 or error.resp.status >= 500
+    if isinstance(error, (FileNotFoundError, PermissionError)):
+        return False  # fichier local disparu ou verrouillé
+    # OSError couvre les erreurs socket et SSL, et celles que httplib2 relance telles quelles
+    # après ses tentatives (ENETUNREACH, EADDRNOTAVAIL : WinError 10051/10049)
+    return isinstance(error, (OSError, http.client.HTTPException, httplib2.HttpLib2Error, TransportError))
+
+
+def probe_drive():
+    """Sonde peu coûteuse : simple connexion TCP vers l'API, sans authentification."""
+    try:
+        with socket.create_connection(PROBE_HOST, timeout=PROBE_TIMEOUT):
+            return True
+    except OSError as e:
+        connectivity_logger.debug(f"Sonde de connectivité en échec : {e}")
+        return False
+
+
+class CircuitBreaker:
+    """Disjoncteur autour des accès Drive (fermé → ouvert → semi-ouvert → fermé)."""
+
+    def __init__(self, name, probe=probe_drive, failure_threshold=FAILURE_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT, max_reset_timeout=MAX_RESET_TIMEOUT):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.current_timeout = reset_timeout
+        self.next_probe = 0
+        self.trial_deadline = 0     # semi-ouvert : une seule requête d'essai à la fois
+        self._lock = threading.Lock()
+        metrics.set_gauge(f"{self.name}_circuit", self.state)
+
+    def _transition(self, state, reason):
+        previous, self.state = self.state, state
+        connectivity_logger.warning(f"Disjoncteur {self.name} : {previous} → {state} ({reason})")
+        metrics.set_gauge(f"{self.name}_circuit", state)
+        metrics.inc_counter(f"{self.name}_circuit_{state}")
+        metrics.record_event("circuit", self.name, message=f"{previous} → {state} : {reason}")
+
+    def _probe_if_due(self):
+        """Ouvert : sonde si le délai est écoulé et passe en semi-ouvert si elle réussit."""
+        if time.monotonic() < self.next_probe:
+            return False
+        if self.probe():
+            self._transition(HALF_OPEN, "sonde réussie")
+            self.trial_deadline = 0
+            return True
+        self.current_timeout = min(self.current_timeout * 2, self.max_reset_timeout)
+        self.next_probe = time.monotonic() + self.current_timeout
+        connectivity_logger.info(f"Sonde en échec, prochain essai dans {self.current_timeout}s")
+        return False
+
+    def ready(self):
+        """Drive semble joignable, sans réserver la requête d'essai du mode semi-ouvert."""
+        with self._lock:
+            if self.state == OPEN and not self._probe_if_due():
+                return False
+            return self.state == CLOSED or time.monotonic() >= self.trial_deadline
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and not self._probe_if_due():
+                return False
+            # Semi-ouvert : une seule requête d'essai, les autres attendent son résultat. Si elle
+            # n'aboutit ni à un succès ni à une panne, un nouvel essai est admis après le délai.
+            if time.monotonic() < self.trial_deadline:
+                return False
+            self.trial_deadline = time.monotonic() + self.reset_timeout
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.current_timeout = self.reset_timeout
+            if self.state != CLOSED:
+                self._transition(CLOSED, "requête réussie")
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.next_probe = time.monotonic() + self.current_timeout
+                self._transition(OPEN, f"{self.failures} échec(s), dernier : {error}")
+
+    def is_closed(self):
+        return self.state == CLOSED
+
+
+class OfflineSpool:
+    """File persistante des fichiers détectés pendant une panne (chemins uniquement).
+
+    Une entrée avec 'src' est un renommage/déplacement local à rejouer tel quel ; une entrée
+    avec 'not_before' (quota épuisé) n'est pas rejouée avant cet instant.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = self._load()
+        metrics.register_gauge("spool_depth", lambda: len(self.entries))
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            connectivity_logger.error(f"Erreur lors du chargement du spool : {e}")
+        return []
+
+    def _save(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2)
+        except IOError as e:
+            connectivity_logger.error(f"Erreur lors de la sauvegarde du spool : {e}")
+
+    def add(self, file_path, drive_folder, src_path=None, not_before=None):
+        with self._lock:
+            for entry in self.entries:
+                if src_path is not None and entry['path'] == src_path:
+                    # Fichier déjà en attente renommé à nouveau : seule la destination change
+                    entry['path'] = file_path
+                    self._save()
+                    return
+            if any(entry['path'] == file_path for entry in self.entries):
+                return
+            entry = {'path': file_path, 'drive_folder': drive_folder, 'queued': time.time()}
+            if src_path is not None:
+                entry['src'] = src_path
+            if not_before is not None and not_before > time.time():
+                entry['not_before'] = not_before
+            self.entries.append(entry)
+            self._save()
+        connectivity_logger.info(f"Drive indisponible, fichier mis en attente : {file_path}")
+
+    def peek(self):
+        """Première entrée prête à être rejouée (les entrées en pause de quota sont sautées)."""
+        now = time.time()
+        with self._lock:
+            for entry in self.entries:
+                if entry.get('not_before', 0) <= now:
+                    return dict(entry)
+            return None
+
+    def remove(self, file_path):
+        with self._lock:
+            self.entries = [entry for entry in self.entries if entry['path'] != file_path]
+            self._save()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+drive_breaker = CircuitBreaker("drive")
+spool = OfflineSpool(get_spool_file())
+
+# --- Vidange du spool ---
+_drain_thread = None
+drain_stop_flag = threading.Event()
+
+
+def _drain_loop(upload_func, move_func, interval):
+    while not drain_stop_flag.wait(interval):
+        entry = spool.peek()
+        # ready() et non allow_request() : l'envoi rejoué réserve lui-même la requête d'essai
+        if entry is None or not drive_breaker.ready():
+            continue
+        try:
+            # Retiré avant l'envoi : en cas de nouvelle panne, l'uploader le remet en attente
+            spool.remove(entry['path'])
+            if not os.path.exists(entry['path']):
+                connectivity_logger.warning(f"Fichier en attente disparu, retiré du spool : {entry['path']}")
+                continue
+            connectivity_logger.info(f"Vidange du spool ({len(spool)} restant(s)) : {entry['path']}")
+            if 'src' in entry:
+                move_func(entry['src'], entry['path'], entry['drive_folder'])
+            else:
+                upload_func(entry['path'], entry['drive_folder'])
+        except Exception as e:
+            connectivity_logger.error(f"Erreur lors de la vidange du spool : {e}", exc_info=True)
+
+
+def start_spool_drainer(upload_func, move_func, interval=DRAIN_INTERVAL):
+    """Renvoie les fichiers en attente, un toutes les `interval` secondes, dès que Drive répond.
+
+    Les renommages mis en attente sont rejoués par `move_func(src, dest, dossier)`.
+    """
+    global _drain_thread
+    if _drain_thread is not None and _drain_thread.is_alive():
+        return
+    drain_stop_flag.clear()
+    _drain_thread = threading.Thread(target=_drain_loop, args=(upload_func, move_func, interval),
+                                     name="SpoolDrainer", daemon=True)
+    _drain_thread.start()
+
+
+def stop_spool_drainer():
+    global _drain_thread
+    drain_stop_flag.set()
+    if _drain_thread is not None:
+        _drain_thread.join(timeout=5)
+        _drain_thread = None
@@ -14,6 +14,19 @@ auth_logger = setup_logger("auth", "auth.log")
 auth_logger.info("=== Auth logger initialisé ===")
 
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
+# Comptes supplémentaires : drive.file ne couvre que les fichiers créés par le compte lui-même,
+# pas l'arborescence du compte principal dans laquelle ils écrivent
+SECONDARY_SCOPES = ['https://www.googleapis.com/auth/drive']
+
+
+class AuthorizationRequired(Exception):
+    """Compte sans jeton valide alors que le flux OAuth interactif est exclu (service Windows)."""
+
+    def __init__(self, account, reason):
+        super().__init__(f"Compte {account} non autorisé ({reason}) : exécutez « python drive_auth.py {account} »")
+        self.account = account
+        self.reason = reason
+
 
 def resource_path(relative_path):
     """ Permet de récupérer le chemin absolu même dans un EXE PyInstaller """
@@ -33,9 +46,15 @@ def resource_path(relative_path):
             return candidate
     return os.path.join(base_path, relative_path)
 
-def authenticate_drive():
+def authenticate_drive(account=None, request_builder=None, interactive=True):
+    """Service Drive pour un compte autorisé (token.pickle par défaut, tokens/token_<compte>.pickle sinon).
+
+    Avec interactive=False, un jeton absent, révoqué ou de portée insuffisante lève
+    AuthorizationRequired au lieu d'ouvrir le navigateur.
+    """
     creds = None
-    token_path = get_token_file()
+    token_path = get_token_file(account)
+    scopes = SCOPES if not account or account == "default" else SECONDARY_SCOPES
     creds_path = resource_path('credentials.json')
 
     # Vérifier que le fichier credentials existe
@@ -49,6 +68,9 @@ def authenticate_drive():
             with open(token_path, 'rb') as f:
                 creds = pickle.load(f)
             auth_logger.info("Token d'authentification chargé depuis le cache")
+            if creds and not creds.has_scopes(scopes):
+                auth_logger.warning(f"Token du compte {account or 'default'} sans la portée requise, nouvelle autorisation nécessaire")
+                creds = None
 
         # Si pas de credentials valides, en créer de nouveaux
         if not creds or not creds.valid:
@@ -60,9 +82,11 @@ def authenticate_drive():
                 except RefreshError as e:
                     auth_logger.warning(f"Impossible de rafraîchir le token : {e}")
                     creds = None
+            if not creds and not interactive:
+                raise AuthorizationRequired(account, "jeton absent ou révoqué")
             if not creds:
                 auth_logger.info("Démarrage du flux d'authentification OAuth...")
-                flow = InstalledAppFlow.from_client_secrets_file(creds_path, SCOPES)
+                flow = InstalledAppFlow.from_client_secrets_file(creds_path, scopes)
                 creds = flow.run_local_server(port=0)
                 auth_logger.info("Authentification OAuth réussie")
 
@@ -72,10 +96,18 @@ def authenticate_drive():
             auth_logger.info("Token d'authentification sauvegardé")
 
         # Construire le service Drive
-        service = build('drive', 'v3', credentials=creds)
-        auth_logger.info("Service Google Drive initialisé avec succès")
+        if request_builder is not None:
+            service = build('drive', 'v3', credentials=creds, requestBuilder=request_builder)
+        else:
+            service = build('drive', 'v3', credentials=creds)
+        auth_logger.info(f"Service Google Drive initialisé avec succès (compte : {account or 'default'})")
         return service
 
     except Exception as e:
         auth_logger.error(f"Erreur lors de l'authentification Google Drive : {e}")
         raise
+
+
+if __name__ == '__main__':
+    # Autoriser un compte supplémentaire : python drive_auth.py <nom_du_compte>
+    authenticate_drive(sys.argv[1] if len(sys.argv) > 1 else None)
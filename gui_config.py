@@ -5,6 +5,8 @@ import json
 import os
 import subprocess
 import shutil
+import threading
+import queue
 from drive_auth import authenticate_drive
 from logger_utils import setup_logger
 from paths import get_config_file, get_base_dir
@@ -17,6 +19,30 @@ os.makedirs(CONFIG_DIR, exist_ok=True)
 CONFIG_FILE = get_config_file()
 
 
+def run_in_background(widget, func, on_done=None, on_error=None):
+    """Exécute func dans un thread et rappelle on_done/on_error sur le thread Tk."""
+    results = queue.Queue(maxsize=1)
+
+    def worker():
+        try:
+            results.put((True, func()))
+        except Exception as e:
+            results.put((False, e))
+
+    def poll():
+        try:
+            ok, value = results.get_nowait()
+        except queue.Empty:
+            widget.after(100, poll)
+            return
+        callback = on_done if ok else on_error
+        if callback:
+            callback(value)
+
+    threading.Thread(target=worker, daemon=True).start()
+    widget.after(100, poll)
+
+
 def validate_folder_path(path):
     """Valide qu'un chemin de dossier existe et est accessible"""
     if not path:
@@ -30,7 +56,34 @@ def validate_folder_path(path):
     return True, "OK"
 
 
-def uninstall_service():
+def _uninstall_steps():
+    gui_logger.info("Début de la désinstallation du service")
+
+    # Arrêter le service
+    try:
+        subprocess.run(['python', 'install_service.py', 'stop'], check=True, capture_output=True, timeout=30)
+        gui_logger.info("Service arrêté avec succès")
+    except subprocess.TimeoutExpired:
+        gui_logger.warning("Timeout lors de l'arrêt du service")
+    except subprocess.CalledProcessError as e:
+        gui_logger.warning(f"Erreur lors de l'arrêt du service : {e}")
+
+    # Supprimer le service
+    try:
+        subprocess.run(['python', 'install_service.py', 'remove'], check=True, capture_output=True, timeout=30)
+        gui_logger.info("Service supprimé avec succès")
+    except subprocess.TimeoutExpired:
+        gui_logger.warning("Timeout lors de la suppression du service")
+    except subprocess.CalledProcessError as e:
+        gui_logger.warning(f"Erreur lors de la suppression du service : {e}")
+
+    # Supprimer les fichiers de configuration
+    if os.path.exists(CONFIG_DIR):
+        shutil.rmtree(CONFIG_DIR)
+        gui_logger.info("Dossier de configuration supprimé")
+
+
+def uninstall_service(root):
     confirm = messagebox.askyesno(
         "Confirmation",
         "Voulez-vous vraiment désinstaller le service ?\n"
@@ -38,40 +91,20 @@ def uninstall_service():
     )
     if not confirm:
         return
-    try:
-        gui_logger.info("Début de la désinstallation du service")
-
-        # Arrêter le service
-        try:
-            subprocess.run(['python', 'install_service.py', 'stop'], check=True, capture_output=True, timeout=30)
-            gui_logger.info("Service arrêté avec succès")
-        except subprocess.TimeoutExpired:
-            gui_logger.warning("Timeout lors de l'arrêt du service")
-        except subprocess.CalledProcessError as e:
-            gui_logger.warning(f"Erreur lors de l'arrêt du service : {e}")
-
-        # Supprimer le service
-        try:
-            subprocess.run(['python', 'install_service.py', 'remove'], check=True, capture_output=True, timeout=30)
-            gui_logger.info("Service supprimé avec succès")
-        except subprocess.TimeoutExpired:
-            gui_logger.warning("Timeout lors de la suppression du service")
-        except subprocess.CalledProcessError as e:
-            gui_logger.warning(f"Erreur lors de la suppression du service : {e}")
-
-        # Supprimer les fichiers de configuration
-        if os.path.exists(CONFIG_DIR):
-            shutil.rmtree(CONFIG_DIR)
-            gui_logger.info("Dossier de configuration supprimé")
 
+    def on_done(_):
         messagebox.showinfo("Désinstallation", "Le service a été désinstallé avec succès.\n"
                             "L'application va se fermer.")
         gui_logger.info("Désinstallation terminée avec succès")
         os._exit(0)
-    except Exception as e:
+
+    def on_error(e):
         gui_logger.error(f"Erreur lors de la désinstallation : {e}")
         messagebox.showerror("Erreur", f"Erreur lors de la désinstallation : {e}")
 
+    root.config(cursor="watch")
+    run_in_background(root, _uninstall_steps, on_done, on_error)
+
 
 def save_config(local_folder, drive_folder):
     try:
@@ -170,18 +203,32 @@ def launch_config_interface():
     button_frame = ttk.Frame(main_frame)
     button_frame.pack(fill=tk.X, pady=(20, 0))
 
-    # Connexion Google Drive
+    # Connexion Google Drive (hors du thread Tk : le flux OAuth et les appels réseau bloquent)
     def connect_drive():
-        try:
-            gui_logger.info("Test de connexion Google Drive...")
-            service = authenticate_drive()
-            messagebox.showinfo("Succès", "Connexion Google Drive réussie.")
+        gui_logger.info("Test de connexion Google Drive...")
+        connect_button.state(['disabled'])
+
+        def on_done(_):
+            connect_button.state(['!disabled'])
             gui_logger.info("Connexion Google Drive réussie")
-        except Exception as e:
+            messagebox.showinfo("Succès", "Connexion Google Drive réussie.")
+
+        def on_error(e):
+            connect_button.state(['!disabled'])
             gui_logger.error(f"Erreur de connexion Google Drive : {e}")
             messagebox.showerror("Erreur", f"Erreur de connexion : {e}")
 
-    ttk.Button(button_frame, text="Tester la connexion Google Drive", command=connect_drive).pack(side=tk.LEFT, padx=(0, 10))
+        run_in_background(root, authenticate_drive, on_done, on_error)
+
+    connect_button = ttk.Button(button_frame, text="Tester la connexion Google Drive", command=connect_drive)
+    connect_button.pack(side=tk.LEFT, padx=(0, 10))
+
+    # Tableau de bord de synchronisation
+    def open_dashboard():
+        from gui_dashboard import open_dashboard as show_dashboard
+        show_dashboard(root)
+
+    ttk.Button(button_frame, text="Tableau de bord", command=open_dashboard).pack(side=tk.LEFT)
 
     # Sauvegarder la configuration
     def save_all():
@@ -199,7 +246,7 @@ def launch_config_interface():
     ttk.Button(button_frame, text="Sauvegarder", command=save_all).pack(side=tk.RIGHT)
 
     # Bouton de désinstallation
-    ttk.Button(main_frame, text="Désinstaller le service", command=uninstall_service, style='Danger.TButton').pack(pady=(20, 0))
+    ttk.Button(main_frame, text="Désinstaller le service", command=lambda: uninstall_service(root), style='Danger.TButton').pack(pady=(20, 0))
 
     # Style pour le bouton de danger
     style.configure('Danger.TButton', foreground='red')
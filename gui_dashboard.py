@@ -0,0 +1,276 @@
+# gui_dashboard.py
+import os
+import time
+import tkinter as tk
+from tkinter import ttk
+from gui_config import run_in_background, gui_logger
+from metrics import read_metrics_file, read_metrics_version
+from paths import get_metrics_file
+
+REFRESH_INTERVAL_MS = 1000
+STALE_AFTER = 10            # secondes sans mise à jour avant de considérer le service arrêté
+MAX_HISTORY = 50000         # événements conservés côté GUI
+MAX_THROUGHPUT_POINTS = 3600
+
+
+def format_size(size):
+    for unit in ("o", "Ko", "Mo", "Go"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "o" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} To"
+
+
+def format_rate(rate):
+    return f"{format_size(rate)}/s"
+
+
+class VirtualList(ttk.Frame):
+    """Liste virtualisée : seules les lignes visibles existent dans le Treeview.
+
+    Les données sont conservées dans une liste Python ; le défilement ne fait que
+    réécrire les valeurs des lignes visibles, quel que soit le nombre d'entrées.
+    Les entrées les plus récentes sont affichées en haut.
+    """
+
+    def __init__(self, parent, columns, widths, visible_rows=12):
+        super().__init__(parent)
+        self.items = []
+        self.offset = 0
+        self.visible_rows = visible_rows
+        self.columns = [c for c, _ in columns]
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings",
+                                 height=visible_rows, selectmode="none")
+        for (column, heading), width in zip(columns, widths):
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, stretch=(column == self.columns[-1]))
+        self.rows = [self.tree.insert("", tk.END, values=()) for _ in range(visible_rows)]
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<MouseWheel>", lambda e: self._scroll_by(-1 if e.delta > 0 else 1))
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-1))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(1))
+        self._render()
+
+    def append(self, new_items):
+        if not new_items:
+            return
+        self.items.extend(new_items)
+        if self.offset > 0:
+            # L'utilisateur consulte l'historique : garder les mêmes lignes à l'écran
+            self.offset += len(new_items)
+        overflow = len(self.items) - MAX_HISTORY
+        if overflow > 0:
+            del self.items[:overflow]
+        self.offset = min(self.offset, self._max_offset())
+        self._render()
+
+    def _max_offset(self):
+        return max(0, len(self.items) - self.visible_rows)
+
+    def _scroll_by(self, rows):
+        self.offset = max(0, min(self.offset + rows, self._max_offset()))
+        self._render()
+
+    def _on_scroll(self, action, value, unit=None):
+        if action == "moveto":
+            self.offset = int(float(value) * len(self.items))
+            self._scroll_by(0)
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self._scroll_by(int(value) * step)
+
+    def _render(self):
+        total = len(self.items)
+        for i, row in enumerate(self.rows):
+            index = total - 1 - (self.offset + i)
+            values = self.items[index] if 0 <= index < total else ("",) * len(self.columns)
+            self.tree.item(row, values=values)
+        if total <= self.visible_rows:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + self.visible_rows) / total)
+
+
+class SyncDashboard:
+    """Fenêtre de suivi en direct alimentée par le fichier de métriques du service."""
+
+    def __init__(self, parent):
+        self.window = tk.Toplevel(parent)
+        self.window.title("AudioDriveSync - Tableau de bord")
+        self.window.geometry("760x620")
+        self.metrics_file = get_metrics_file()
+        self.last_version = None     # (pid, version) de la dernière lecture complète
+        self.last_event_seq = 0
+        self.last_sample_time = 0
+        self.throughput = []
+        self.loading = False
+        self.closed = False
+
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        # Résumé
+        summary = ttk.LabelFrame(frame, text="État", padding="8")
+        summary.pack(fill=tk.X)
+        self.status_var = tk.StringVar(value="En attente des métriques du service...")
+        self.summary_var = tk.StringVar(value="")
+        ttk.Label(summary, textvariable=self.status_var, font=('Arial', 10, 'bold')).pack(anchor=tk.W)
+        ttk.Label(summary, textvariable=self.summary_var).pack(anchor=tk.W)
+
+        # Transferts en cours
+        transfers_frame = ttk.LabelFrame(frame, text="Transferts en cours", padding="8")
+        transfers_frame.pack(fill=tk.X, pady=(10, 0))
+        self.transfers = ttk.Treeview(transfers_frame, columns=("name", "progress", "rate"),
+                                      show="headings", height=4, selectmode="none")
+        for column, heading, width in (("name", "Fichier", 400), ("progress", "Progression", 150),
+                                       ("rate", "Débit", 120)):
+            self.transfers.heading(column, text=heading)
+            self.transfers.column(column, width=width)
+        self.transfers.pack(fill=tk.X)
+
+        # Historique de débit
+        chart_frame = ttk.LabelFrame(frame, text="Débit", padding="8")
+        chart_frame.pack(fill=tk.X, pady=(10, 0))
+        self.chart = tk.Canvas(chart_frame, height=90, background="white", highlightthickness=0)
+        self.chart.pack(fill=tk.X)
+
+        # Historique des envois
+        history_frame = ttk.LabelFrame(frame, text="Historique", padding="8")
+        history_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+        self.history = VirtualList(
+            history_frame,
+            columns=(("time", "Heure"), ("status", "Statut"), ("name", "Fichier"), ("detail", "Détail")),
+            widths=(130, 70, 250, 260),
+        )
+        self.history.pack(fill=tk.BOTH, expand=True)
+
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def close(self):
+        self.closed = True
+        self.window.destroy()
+
+    def _load(self):
+        """Exécuté hors du thread Tk : ne relit le détail que si la version publiée a changé.
+
+        La date du fichier sert de signe de vie ; le service la rafraîchit sans réécrire
+        le fichier tant que rien ne change.
+        """
+        try:
+            mtime = os.path.getmtime(self.metrics_file)
+        except OSError:
+            return None, None
+        version = read_metrics_version(self.metrics_file)
+        if version is None or version == self.last_version:
+            return mtime, None
+        return mtime, read_metrics_file(self.metrics_file)
+
+    def refresh(self):
+        if self.closed:
+            return
+        if not self.loading:
+            self.loading = True
+            run_in_background(self.window, self._load, self._apply, self._on_error)
+        self.window.after(REFRESH_INTERVAL_MS, self.refresh)
+
+    def _on_error(self, e):
+        self.loading = False
+        gui_logger.warning(f"Lecture des métriques impossible : {e}")
+
+    def _apply(self, result):
+        self.loading = False
+        if self.closed:
+            return
+        mtime, data = result
+        if mtime is None:
+            self.status_var.set("Service inactif : aucune métrique publiée")
+            return
+        if data is not None:
+            if self.last_version is not None and data.get("pid") != self.last_version[0]:
+                # Service redémarré : numéros d'événements et échantillons repartent de zéro
+                self.last_event_seq = 0
+                self.last_sample_time = 0
+            self.last_version = (data.get("pid"), data.get("version"))
+        if time.time() - mtime > STALE_AFTER:
+            self.status_var.set(f"Service inactif depuis {time.strftime('%H:%M:%S', time.localtime(mtime))}")
+        elif self.last_version is not None:
+            self.status_var.set(f"Service actif (pid {self.last_version[0]})")
+        if data is None:
+            return
+
+        counters = data.get("counters", {})
+        gauges = data.get("gauges", {})
+        parts = [
+            f"File d'attente : {gauges.get('queue_depth', 0)}",
+            f"Envoyés : {counters.get('uploaded', 0)} ({format_size(counters.get('bytes_uploaded', 0))})",
+            f"Échecs : {counters.get('failed', 0)}",
+        ]
+        extra = [f"{name} : {value}" for name, value in sorted(gauges.items()) if name != "queue_depth"]
+        self.summary_var.set("    ".join(parts + extra))
+
+        self._update_transfers(data.get("transfers", []))
+        self._update_history(data.get("events", []))
+        self._update_chart(data.get("throughput", []))
+
+    def _update_transfers(self, transfers):
+        current = {}
+        for transfer in transfers:
+            size = transfer.get("size") or 1
+            percent = 100 * transfer.get("sent", 0) / size
+            current[transfer["name"]] = (transfer["name"], f"{percent:.0f} % de {format_size(size)}",
+                                         format_rate(transfer.get("rate", 0)))
+        for item in self.transfers.get_children():
+            if item not in current:
+                self.transfers.delete(item)
+        for name, values in current.items():
+            if self.transfers.exists(name):
+                self.transfers.item(name, values=values)
+            else:
+                self.transfers.insert("", tk.END, iid=name, values=values)
+
+    def _update_history(self, events):
+        new_rows = []
+        for event in events:
+            if event.get("seq", 0) <= self.last_event_seq:
+                continue
+            self.last_event_seq = event["seq"]
+            stamp = time.strftime("%d/%m %H:%M:%S", time.localtime(event.get("time", 0)))
+            if event.get("kind") == "success":
+                detail = f"{format_size(event.get('size', 0))} à {format_rate(event.get('rate', 0))}"
+                status = "OK"
+            else:
+                detail = event.get("message", "")
+                status = "Échec" if event.get("kind") == "failure" else event.get("kind", "")
+            new_rows.append((stamp, status, event.get("name", ""), detail))
+        self.history.append(new_rows)
+
+    def _update_chart(self, samples):
+        new_samples = [s for s in samples if s[0] > self.last_sample_time]
+        if not new_samples:
+            return
+        self.last_sample_time = new_samples[-1][0]
+        self.throughput.extend(new_samples)
+        del self.throughput[:-MAX_THROUGHPUT_POINTS]
+
+        self.chart.delete("all")
+        width = max(self.chart.winfo_width(), 2)
+        height = int(self.chart["height"])
+        points = self.throughput[-width:]
+        peak = max((rate for _, rate in points), default=0) or 1
+        step = width / max(len(points) - 1, 1)
+        coords = []
+        for i, (_, rate) in enumerate(points):
+            coords.extend((i * step, height - 4 - (height - 16) * rate / peak))
+        if len(coords) >= 4:
+            self.chart.create_line(*coords, fill="#1a73e8", width=2)
+        self.chart.create_text(4, 2, anchor=tk.NW, text=f"max {format_rate(peak)}", fill="gray")
+
+
+def open_dashboard(parent):
+    return SyncDashboard(parent)
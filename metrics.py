@@ -0,0 +1,235 @@
+# metrics.py
+import os
+import json
+import time
+import threading
+from collections import deque
+from logger_utils import setup_logger
+from paths import get_metrics_file
+
+# --- Initialisation logging robuste ---
+metrics_logger = setup_logger("metrics", "metrics.log")
+metrics_logger.info("=== Metrics logger initialisé ===")
+
+METRICS_INTERVAL = 1        # secondes entre deux vérifications de l'état à publier
+HEARTBEAT_INTERVAL = 5      # état inchangé : seule la date du fichier est rafraîchie
+MAX_EVENTS = 200            # événements récents conservés dans le fichier
+MAX_THROUGHPUT_SAMPLES = 600
+
+# --- Variables globales ---
+_lock = threading.Lock()
+_counters = {"uploaded": 0, "failed": 0, "bytes_uploaded": 0}
+_gauges = {}
+_gauge_sources = {}
+_transfers = {}
+_events = deque(maxlen=MAX_EVENTS)
+_throughput = deque(maxlen=MAX_THROUGHPUT_SAMPLES)
+_event_seq = 0
+_version = 0                # incrémenté à chaque changement d'état publié
+_bytes_total = 0            # octets envoyés, transferts en cours compris
+_writer_thread = None
+writer_stop_flag = threading.Event()
+
+
+def _changed():
+    """À appeler sous _lock après toute modification de l'état publié."""
+    global _version
+    _version += 1
+
+
+def inc_counter(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+        _changed()
+
+
+def set_gauge(name, value):
+    with _lock:
+        if _gauges.get(name) != value or name not in _gauges:
+            _gauges[name] = value
+            _changed()
+
+
+def register_gauge(name, source):
+    """Enregistre une fonction évaluée à chaque écriture (ex : profondeur de file)."""
+    with _lock:
+        _gauge_sources[name] = source
+
+
+def unregister_gauge(name):
+    with _lock:
+        _gauge_sources.pop(name, None)
+        _gauges.pop(name, None)
+        _changed()
+
+
+def record_event(kind, name, **fields):
+    global _event_seq
+    with _lock:
+        _event_seq += 1
+        event = {"seq": _event_seq, "time": time.time(), "kind": kind, "name": name}
+        event.update(fields)
+        _events.append(event)
+        if kind == "failure":
+            _counters["failed"] += 1
+        _changed()
+
+
+def begin_transfer(path, size):
+    with _lock:
+        _transfers[path] = {
+            "name": os.path.basename(path),
+            "size": size,
+            "sent": 0,
+            "started": time.time(),
+        }
+        _changed()
+
+
+def update_transfer(path, sent):
+    global _bytes_total
+    with _lock:
+        transfer = _transfers.get(path)
+        if transfer is None:
+            return
+        _bytes_total += max(0, sent - transfer["sent"])
+        transfer["sent"] = sent
+        _changed()
+
+
+def end_transfer(path, success):
+    """Clôt un transfert. Les échecs sont consignés par l'appelant via record_event."""
+    global _bytes_total
+    with _lock:
+        transfer = _transfers.pop(path, None)
+        if transfer is None:
+            return
+        _changed()
+        if not success:
+            return
+        _bytes_total += max(0, transfer["size"] - transfer["sent"])
+        _counters["uploaded"] += 1
+        _counters["bytes_uploaded"] += transfer["size"]
+        duration = max(time.time() - transfer["started"], 1e-6)
+    record_event("success", transfer["name"], size=transfer["size"],
+                 duration=round(duration, 3), rate=int(transfer["size"] / duration))
+
+
+def snapshot():
+    """Retourne l'état courant des métriques sous forme de dictionnaire sérialisable."""
+    with _lock:
+        sources = list(_gauge_sources.items())
+    gauges = {}
+    for name, source in sources:
+        try:
+            gauges[name] = source()
+        except Exception as e:
+            metrics_logger.debug(f"Jauge {name} indisponible : {e}")
+    now = time.time()
+    with _lock:
+        gauges.update(_gauges)
+        transfers = []
+        for transfer in _transfers.values():
+            elapsed = max(now - transfer["started"], 1e-6)
+            transfers.append(dict(transfer, rate=int(transfer["sent"] / elapsed)))
+        return {
+            "pid": os.getpid(),
+            "version": _version,
+            "updated": now,
+            "counters": dict(_counters),
+            "gauges": gauges,
+            "transfers": transfers,
+            "events": list(_events),
+            "throughput": list(_throughput),
+        }
+
+
+def write_metrics_file(data=None):
+    """Écrit l'en-tête (pid, version) sur la première ligne, puis le détail sur la seconde."""
+    data = data or snapshot()
+    header = {key: data[key] for key in ("pid", "version", "updated")}
+    body = {key: value for key, value in data.items() if key not in header}
+    path = get_metrics_file()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+        json.dump(body, f)
+    os.replace(tmp_path, path)  # écriture atomique : le GUI ne lit jamais un fichier partiel
+
+
+def read_metrics_version(path=None):
+    """Lit uniquement l'en-tête du fichier de métriques : (pid, version), ou None."""
+    path = path or get_metrics_file()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+        return header.get("pid"), header.get("version")
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, IOError, AttributeError) as e:
+        metrics_logger.debug(f"En-tête des métriques illisible : {e}")
+        return None
+
+
+def read_metrics_file(path=None):
+    """Lit le fichier de métriques publié par le service. Retourne None s'il est absent ou illisible."""
+    path = path or get_metrics_file()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.loads(f.readline())
+            data.update(json.loads(f.read()))
+            return data
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, IOError, AttributeError) as e:
+        metrics_logger.debug(f"Fichier de métriques illisible : {e}")
+        return None
+
+
+def _writer_loop():
+    last_total = _bytes_total
+    last_time = time.monotonic()
+    last_state = None
+    last_write = 0
+    while not writer_stop_flag.wait(METRICS_INTERVAL):
+        try:
+            now = time.monotonic()
+            total = _bytes_total
+            rate = int((total - last_total) / max(now - last_time, 1e-6))
+            last_total, last_time = total, now
+            with _lock:
+                # Au repos, aucun échantillon : seul le retour à zéro est enregistré
+                if rate or (_throughput and _throughput[-1][1]):
+                    _throughput.append([round(time.time(), 1), rate])
+                    _changed()
+
+            data = snapshot()
+            state = (data["version"], json.dumps(data["gauges"], sort_keys=True, default=str))
+            if state != last_state:
+                write_metrics_file(data)
+                last_state, last_write = state, now
+            elif now - last_write >= HEARTBEAT_INTERVAL:
+                # Signe de vie sans réécriture : le GUI ne relit que si la version change
+                os.utime(get_metrics_file())
+                last_write = now
+        except Exception as e:
+            metrics_logger.error(f"Erreur lors de l'écriture des métriques : {e}")
+
+
+def start_metrics_writer():
+    """Publie périodiquement les métriques dans metrics.json pour le tableau de bord."""
+    global _writer_thread
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return
+    writer_stop_flag.clear()
+    _writer_thread = threading.Thread(target=_writer_loop, name="MetricsWriter", daemon=True)
+    _writer_thread.start()
+    metrics_logger.info(f"Publication des métriques dans {get_metrics_file()}")
+
+
+def stop_metrics_writer():
+    global _writer_thread
+    writer_stop_flag.set()
+    if _writer_thread is not None:
+        _writer_thread.join(timeout=METRICS_INTERVAL + 1)
+        _writer_thread = None
@@ -21,7 +21,36 @@ def get_uploaded_db():
     os.makedirs(base, exist_ok=True)
     return os.path.join(base, "uploaded_files.json")
 
-def get_token_file():
+def get_token_file(account=None):
     base = get_base_dir()
     os.makedirs(base, exist_ok=True)
-    return os.path.join(base, "token.pickle")
+    if not account or account == "default":
+        return os.path.join(base, "token.pickle")
+    tokens_dir = os.path.join(base, "tokens")
+    os.makedirs(tokens_dir, exist_ok=True)
+    return os.path.join(tokens_dir, f"token_{account}.pickle")
+
+def get_profile_request_file():
+    base = get_base_dir()
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, "profile_request.json")
+
+def get_metrics_file():
+    base = get_base_dir()
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, "metrics.json")
+
+def get_spool_file():
+    base = get_base_dir()
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, "spool.json")
+
+def get_path_index_db():
+    base = get_base_dir()
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, "uploaded_paths.json")
+
+def get_account_quota_file():
+    base = get_base_dir()
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, "account_quota.json")
@@ -0,0 +1,246 @@
+# profiler.py
+import os
+import sys
+import json
+import time
+import threading
+import traceback
+import cProfile
+import pstats
+import io
+import tracemalloc
+from collections import Counter
+from logger_utils import setup_logger
+from paths import get_log_dir, get_profile_request_file
+
+# --- Initialisation logging robuste ---
+profiler_logger = setup_logger("profiler", "profiler.log")
+profiler_logger.info("=== Profiler logger initialisé ===")
+
+CONTROL_POLL_INTERVAL = 5      # secondes entre deux vérifications du fichier de contrôle
+DEFAULT_DURATION = 30          # durée de capture par défaut (secondes)
+MAX_DURATION = 600
+SAMPLE_INTERVAL = 0.01         # période d'échantillonnage des piles (secondes)
+ALL_MODES = ("sample", "cprofile", "tracemalloc")
+
+# --- Variables globales ---
+_active_capture = None
+_capture_lock = threading.Lock()
+_calls_done = threading.Condition(_capture_lock)   # fin d'un appel profilé
+_control_thread = None
+control_stop_flag = threading.Event()
+
+
+class ProfileCapture:
+    """Capture ponctuelle : échantillonnage des piles, cProfile et tracemalloc."""
+
+    def __init__(self, duration, modes):
+        self.duration = duration
+        self.modes = set(modes)
+        self.stamp = time.strftime("%Y%m%d_%H%M%S")
+        self.samples = Counter()
+        self._stats = None
+        self._stats_lock = threading.Lock()
+        self._started_tracemalloc = False
+        self.calls_in_flight = 0     # appels profilés en cours (protégé par _capture_lock)
+
+    def add_profile(self, prof):
+        """Fusionne le profil cProfile d'un appel dans la capture courante."""
+        with self._stats_lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(prof)
+            else:
+                self._stats.add(prof)
+
+    def run(self):
+        global _active_capture
+        baseline = None
+        try:
+            if "tracemalloc" in self.modes:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(25)
+                    self._started_tracemalloc = True
+                baseline = tracemalloc.take_snapshot()
+
+            profiler_logger.info(f"Capture démarrée pour {self.duration}s (modes : {', '.join(sorted(self.modes))})")
+            deadline = time.monotonic() + self.duration
+            if "sample" in self.modes:
+                self._sample_until(deadline)
+            else:
+                time.sleep(max(0, deadline - time.monotonic()))
+
+            self._write_thread_dump()
+            if "sample" in self.modes:
+                self._write_samples()
+            if "tracemalloc" in self.modes:
+                self._write_tracemalloc(baseline)
+        except Exception as e:
+            profiler_logger.error(f"Erreur pendant la capture de profil : {e}", exc_info=True)
+        finally:
+            with _capture_lock:
+                _active_capture = None
+                # Un envoi qui dépasse la fenêtre de capture est attendu, sinon son profil serait perdu
+                if self.calls_in_flight:
+                    profiler_logger.info(f"Attente de {self.calls_in_flight} appel(s) profilé(s) en cours...")
+                _calls_done.wait_for(lambda: self.calls_in_flight == 0)
+            if "cprofile" in self.modes:
+                self._write_cprofile()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+            profiler_logger.info(f"Capture terminée, résultats dans {get_log_dir()} (profile_{self.stamp}_*)")
+
+    def _output_path(self, suffix):
+        return os.path.join(get_log_dir(), f"profile_{self.stamp}_{suffix}")
+
+    def _sample_until(self, deadline):
+        own_ident = threading.get_ident()
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+            time.sleep(SAMPLE_INTERVAL)
+
+    def _write_samples(self):
+        # Format « piles repliées », directement exploitable par flamegraph.pl / speedscope
+        with open(self._output_path("samples.txt"), "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def _write_thread_dump(self):
+        frames = sys._current_frames()
+        with open(self._output_path("threads.txt"), "w", encoding="utf-8") as f:
+            for thread in threading.enumerate():
+                frame = frames.get(thread.ident)
+                f.write(f"--- Thread {thread.name} (id={thread.ident}, daemon={thread.daemon}) ---\n")
+                if frame is not None:
+                    f.write("".join(traceback.format_stack(frame)))
+                f.write("\n")
+
+    def _write_tracemalloc(self, baseline):
+        snapshot = tracemalloc.take_snapshot()
+        with open(self._output_path("tracemalloc.txt"), "w", encoding="utf-8") as f:
+            current, peak = tracemalloc.get_traced_memory()
+            f.write(f"Mémoire tracée : {current} octets (pic {peak} octets)\n\n")
+            f.write("=== Top 50 allocations ===\n")
+            for stat in snapshot.statistics("lineno")[:50]:
+                f.write(f"{stat}\n")
+            if baseline is not None:
+                f.write("\n=== Top 50 variations depuis le début de la capture ===\n")
+                for stat in snapshot.compare_to(baseline, "lineno")[:50]:
+                    f.write(f"{stat}\n")
+
+    def _write_cprofile(self):
+        with self._stats_lock:
+            stats = self._stats
+        if stats is None:
+            profiler_logger.info("Aucun appel profilé par cProfile pendant la capture")
+            return
+        stats.dump_stats(self._output_path("cprofile.prof"))
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats("cumulative").print_stats(60)
+        with open(self._output_path("cprofile.txt"), "w", encoding="utf-8") as f:
+            f.write(buffer.getvalue())
+
+
+def profile_call(func, *args, **kwargs):
+    """Exécute func sous cProfile si une capture est active, sinon appel direct.
+
+    Les appelants sont sérialisés (upload_lock) : depuis Python 3.12, cProfile n'admet
+    qu'un profileur actif par processus.
+    """
+    with _capture_lock:
+        capture = _active_capture
+        if capture is None or "cprofile" not in capture.modes:
+            capture = None
+        else:
+            capture.calls_in_flight += 1
+    if capture is None:
+        return func(*args, **kwargs)
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(func, *args, **kwargs)
+    finally:
+        capture.add_profile(prof)
+        with _capture_lock:
+            capture.calls_in_flight -= 1
+            _calls_done.notify_all()
+
+
+def start_capture(duration=DEFAULT_DURATION, modes=ALL_MODES):
+    """Lance une capture en arrière-plan. Retourne False si une capture est déjà en cours."""
+    global _active_capture
+    duration = max(1, min(int(duration), MAX_DURATION))
+    modes = [m for m in modes if m in ALL_MODES] or list(ALL_MODES)
+    with _capture_lock:
+        if _active_capture is not None:
+            profiler_logger.warning("Une capture de profil est déjà en cours, demande ignorée")
+            return False
+        _active_capture = ProfileCapture(duration, modes)
+        capture = _active_capture
+    threading.Thread(target=capture.run, name="ProfileCapture", daemon=True).start()
+    return True
+
+
+def check_profile_request():
+    """Consomme le fichier de contrôle s'il existe et démarre la capture demandée."""
+    request_file = get_profile_request_file()
+    if not os.path.exists(request_file):
+        return False
+    request = {}
+    try:
+        with open(request_file, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        if content:
+            request = json.loads(content)
+    except (json.JSONDecodeError, IOError) as e:
+        profiler_logger.error(f"Fichier de demande de profil illisible : {e}")
+    finally:
+        try:
+            os.remove(request_file)
+        except OSError as e:
+            profiler_logger.warning(f"Impossible de supprimer {request_file} : {e}")
+    return start_capture(request.get("duration", DEFAULT_DURATION), request.get("modes", ALL_MODES))
+
+
+def _control_loop():
+    profiler_logger.info(f"Canal de contrôle du profilage actif : {get_profile_request_file()}")
+    while not control_stop_flag.wait(CONTROL_POLL_INTERVAL):
+        try:
+            check_profile_request()
+        except Exception as e:
+            profiler_logger.error(f"Erreur dans le canal de contrôle du profilage : {e}", exc_info=True)
+
+
+def start_profile_control():
+    """Démarre la surveillance du fichier de contrôle (un simple stat toutes les 5s)."""
+    global _control_thread
+    if _control_thread is not None and _control_thread.is_alive():
+        return
+    control_stop_flag.clear()
+    _control_thread = threading.Thread(target=_control_loop, name="ProfileControl", daemon=True)
+    _control_thread.start()
+
+
+def stop_profile_control():
+    """Arrête la surveillance du fichier de contrôle."""
+    global _control_thread
+    control_stop_flag.set()
+    if _control_thread is not None:
+        _control_thread.join(timeout=CONTROL_POLL_INTERVAL + 1)
+        _control_thread = None
+
+
+if __name__ == '__main__':
+    # Usage : python profiler.py [durée] [sample,cprofile,tracemalloc]
+    duration = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DURATION
+    modes = sys.argv[2].split(",") if len(sys.argv) > 2 else list(ALL_MODES)
+    with open(get_profile_request_file(), "w", encoding="utf-8") as f:
+        json.dump({"duration": duration, "modes": modes}, f)
+    print(f"Demande de profil ({duration}s, {', '.join(modes)}) déposée : {get_profile_request_file()}")
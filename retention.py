@@ -0,0 +1,275 @@
+# retention.py
+import os
+import time
+import shutil
+import threading
+from collections import deque
+from logger_utils import setup_logger
+from connectivity import drive_breaker
+from accounts import account_pool
+from uploader import (load_path_index, save_path_index, load_uploaded_db, get_file_hash,
+                      parse_audio_filename, path_key, upload_lock)
+
+# --- Initialisation logging robuste ---
+retention_logger = setup_logger("retention", "retention.log")
+retention_logger.info("=== Retention logger initialisé ===")
+
+POLICIES = ("none", "archive", "delete_after_days", "keep_last")
+DEFAULT_RETENTION = {
+    "policy": "none",
+    "archive_dir": "",
+    "days": 30,
+    "keep_last": 20,
+    "interval": 2,           # secondes minimum entre deux opérations de nettoyage
+    "sweep_interval": 3600,  # balayage complet de l'index (fichiers déjà envoyés)
+}
+
+# --- Variables globales ---
+_worker = None
+_worker_thread = None
+
+
+class RetentionWorker:
+    """Archive ou supprime localement les fichiers dont l'envoi a été vérifié sur Drive."""
+
+    def __init__(self, local_folder, settings):
+        self.local_folder = path_key(local_folder)
+        self.policy = settings["policy"]
+        self.archive_dir = settings["archive_dir"]
+        self.days = settings["days"]
+        self.keep_last = settings["keep_last"]
+        self.interval = settings["interval"]
+        self.sweep_interval = settings["sweep_interval"]
+        self._queue = deque()
+        self._queued = set()
+        self._groups = {}            # keep_last : catégorie → chemins du plus récent au plus ancien
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    # --- Alimentation de la file ---
+
+    def notify(self, file_path):
+        """Signale un fichier qui vient d'être traité par l'uploader."""
+        key = path_key(file_path)
+        index = load_path_index()
+        if key not in index:
+            return
+        if self.policy == "keep_last":
+            category = self._category(key)
+            self._groups[category] = []
+            self._rank_groups(self._local_paths(index, category))
+            self._enqueue(self._groups.get(category, [])[self.keep_last:])
+        elif self._due(key, index[key]):
+            self._enqueue([key])
+
+    def _enqueue(self, paths):
+        with self._lock:
+            for path in paths:
+                if path not in self._queued:
+                    self._queued.add(path)
+                    self._queue.append(path)
+        if paths:
+            self._wake.set()
+
+    def _next(self):
+        with self._lock:
+            if not self._queue:
+                return None
+            path = self._queue.popleft()
+            self._queued.discard(path)
+            return path
+
+    @staticmethod
+    def _category(path):
+        return parse_audio_filename(os.path.basename(path))[3]
+
+    def _local_paths(self, index, category=None):
+        """Chemins de l'index situés dans le dossier surveillé et encore présents."""
+        return [path for path in index
+                if os.path.dirname(path) == self.local_folder
+                and (category is None or self._category(path) == category)
+                and os.path.exists(path)]
+
+    def _rank_groups(self, paths):
+        """Politique keep_last : classe chaque catégorie du plus récent au plus ancien."""
+        groups = {}
+        for path in paths:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue  # disparu entre-temps
+            groups.setdefault(self._category(path), []).append((mtime, path))
+        for category, dated in groups.items():
+            dated.sort(reverse=True)
+            self._groups[category] = [path for _, path in dated]
+
+    def _due(self, key, entry):
+        """Politiques archive et delete_after_days : le fichier peut-il déjà être traité ?"""
+        if self.policy == "archive":
+            return True
+        if self.policy == "delete_after_days":
+            return time.time() - (entry.get("uploaded_at") or 0) >= self.days * 86400
+        return False
+
+    def _sweep(self):
+        """Balayage complet : groupes calculés une fois, seuls les fichiers éligibles sont mis en file."""
+        index = load_path_index()
+        paths = self._local_paths(index)
+        if self.policy == "keep_last":
+            self._groups = {}
+            self._rank_groups(paths)
+            candidates = [path for group in self._groups.values() for path in group[self.keep_last:]]
+        else:
+            candidates = [path for path in paths if self._due(path, index[path])]
+        self._enqueue(candidates)
+
+    # --- Traitement ---
+
+    def _eligible(self, key, entry):
+        if self.policy != "keep_last":
+            return self._due(key, entry)
+        group = self._groups.get(self._category(key), [])
+        if key not in group[self.keep_last:]:
+            return False
+        # Les N plus récents doivent toujours exister (un fichier plus récent a pu être supprimé)
+        newer = 0
+        for path in group[:group.index(key)]:
+            if os.path.exists(path):
+                newer += 1
+                if newer >= self.keep_last:
+                    return True
+        return False
+
+    def _verified(self, key, entry):
+        """Entrée du ledger et checksum Drive identiques au contenu local."""
+        if get_file_hash(key) != entry["hash"]:
+            return False
+        # Le ledger ne garde qu'un fichier Drive par contenu : une copie locale a le sien dans l'index
+        if entry["hash"] not in load_uploaded_db():
+            return False
+        if not drive_breaker.is_closed():
+            return False
+        # Client propre à ce thread, soumis au limiteur du compte propriétaire du fichier
+        service = account_pool.owner_of(entry).thread_service()
+        remote = service.files().get(fileId=entry["id"], fields="md5Checksum,trashed").execute()
+        return remote.get("md5Checksum") == entry["hash"] and not remote.get("trashed")
+
+    def process(self, key):
+        """Traite un fichier. Retourne True si une vérification Drive ou une opération a eu lieu."""
+        index = load_path_index()
+        entry = index.get(key)
+        if entry is None or not os.path.exists(key):
+            return False
+        if not self._eligible(key, entry):
+            return False
+        if not self._verified(key, entry):
+            retention_logger.info(f"Envoi non vérifié sur Drive, fichier conservé : {key}")
+            return True
+
+        # Sous le verrou d'envoi : l'uploader écrit le même index
+        with upload_lock:
+            index = load_path_index()
+            if index.get(key) != entry:
+                return True
+            if self.policy == "archive":
+                os.makedirs(self.archive_dir, exist_ok=True)
+                target = os.path.join(self.archive_dir, self._real_name(key, entry))
+                base, ext = os.path.splitext(target)
+                suffix = 1
+                while os.path.exists(target):
+                    target = f"{base}_{suffix}{ext}"
+                    suffix += 1
+                shutil.move(key, target)
+                index[path_key(target)] = index.pop(key)
+                retention_logger.info(f"Fichier archivé : {key} → {target}")
+            else:
+                os.remove(key)
+                del index[key]
+                retention_logger.info(f"Fichier local supprimé après envoi vérifié : {key}")
+            save_path_index(index)
+        return True
+
+    @staticmethod
+    def _real_name(key, entry):
+        """Nom tel qu'écrit sur disque : la clé d'index (path_key) est en minuscules sous Windows."""
+        name = os.path.basename(key)
+        if entry.get("name") and os.path.normcase(entry["name"]) == name:
+            return entry["name"]
+        with os.scandir(os.path.dirname(key)) as items:
+            for item in items:
+                if os.path.normcase(item.name) == name:
+                    return item.name
+        return name
+
+    def _uploads_active(self):
+        return upload_lock.locked()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def run(self):
+        retention_logger.info(f"Politique de rétention active : {self.policy}")
+        next_sweep = 0
+        while not self._stop.is_set():
+            acted = False
+            try:
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + self.sweep_interval
+                    self._sweep()
+
+                key = self._next()
+                if key is None:
+                    self._wake.wait(timeout=min(max(next_sweep - time.monotonic(), 1), 60))
+                    self._wake.clear()
+                    continue
+
+                # Laisser la priorité aux envois en cours
+                while self._uploads_active() and not self._stop.is_set():
+                    self._stop.wait(self.interval)
+                acted = self.process(key)
+            except Exception as e:
+                retention_logger.error(f"Erreur lors du nettoyage : {e}", exc_info=True)
+                acted = True
+            # Intervalle entre deux opérations réelles uniquement, pas entre deux fichiers écartés
+            if acted:
+                self._stop.wait(self.interval)
+
+
+def load_retention_settings(config):
+    settings = dict(DEFAULT_RETENTION)
+    settings.update(config.get("retention") or {})
+    if settings["policy"] not in POLICIES:
+        retention_logger.error(f"Politique de rétention inconnue : {settings['policy']}")
+        settings["policy"] = "none"
+    if settings["policy"] == "archive" and not settings["archive_dir"]:
+        retention_logger.error("Politique 'archive' sans 'archive_dir' : rétention désactivée")
+        settings["policy"] = "none"
+    return settings
+
+
+def start_retention_worker(config):
+    """Démarre le nettoyage en arrière-plan selon config['retention']."""
+    global _worker, _worker_thread
+    settings = load_retention_settings(config)
+    if settings["policy"] == "none":
+        return None
+    _worker = RetentionWorker(config["local_folder"], settings)
+    _worker_thread = threading.Thread(target=_worker.run, name="RetentionWorker", daemon=True)
+    _worker_thread.start()
+    return _worker
+
+
+def notify_uploaded(file_path):
+    if _worker is not None:
+        _worker.notify(file_path)
+
+
+def stop_retention_worker():
+    global _worker, _worker_thread
+    if _worker is not None:
+        _worker.stop()
+        _worker_thread.join(timeout=5)
+        _worker = None
+        _worker_thread = None
@@ -41,6 +41,18 @@ class AudioDriveSyncService(win32serviceutil.ServiceFramework):
         except Exception as e:
             service_logger.warning(f"Erreur lors de l'arrêt du watcher : {e}")
 
+        try:
+            from profiler import stop_profile_control
+            stop_profile_control()
+        except Exception as e:
+            service_logger.warning(f"Erreur lors de l'arrêt du canal de profilage : {e}")
+
+        try:
+            from metrics import stop_metrics_writer
+            stop_metrics_writer()
+        except Exception as e:
+            service_logger.warning(f"Erreur lors de l'arrêt de la publication des métriques : {e}")
+
         win32event.SetEvent(self.stop_event)
 
         if self.worker_thread and self.worker_thread.is_alive():
@@ -114,6 +126,18 @@ class AudioDriveSyncService(win32serviceutil.ServiceFramework):
         """Boucle principale du service."""
         service_logger.info("=== DÉBUT MAIN ===")
 
+        try:
+            from profiler import start_profile_control
+            start_profile_control()
+        except Exception as e:
+            service_logger.warning(f"Canal de profilage indisponible : {e}")
+
+        try:
+            from metrics import start_metrics_writer
+            start_metrics_writer()
+        except Exception as e:
+            service_logger.warning(f"Publication des métriques indisponible : {e}")
+
         while not self._stopping:
             config = self.check_config()
             if not config:
@@ -122,19 +146,15 @@ class AudioDriveSyncService(win32serviceutil.ServiceFramework):
                 continue
 
             try:
-                from watcher import start_watcher, cleanup_observer, stop_flag
+                from watcher import start_watcher, cleanup_observer
                 service_logger.info("Démarrage du watcher principal...")
-                stop_flag.clear()
-                start_watcher()  # bloque tant que stop_flag n’est pas défini
+                start_watcher()  # bloque jusqu'à stop_watcher() ; l'observer est relancé en interne
             except Exception as e:
                 service_logger.error(f"Erreur dans le watcher : {e}", exc_info=True)
                 cleanup_observer()
                 time.sleep(10)
                 continue
 
-            # Attente avant un éventuel redémarrage
-            time.sleep(2)
-
         service_logger.info("=== FIN MAIN ===")
 
 
@@ -0,0 +1,596 @@
+# soak_harness.py
+"""Test d'endurance de bout en bout : watcher réel + uploader réel contre un faux Drive local.
+
+Usage : python soak_harness.py [--duration 300] [--rate 12] [--json resultats.json] [--compare precedent.json]
+
+Un générateur de charge écrit des fichiers audio synthétiques dans un dossier temporaire
+surveillé par le WatcherSupervisor (écritures rapides, enregistrements lents, rafales et
+renommages, copies modifiées ensuite). Le faux Drive applique un RTT et un débit configurables et horodate chaque
+confirmation. Le rapport donne les percentiles de latence entre la fermeture du fichier et
+la confirmation d'envoi, les envois manqués ou dupliqués, et l'évolution CPU / mémoire.
+
+Code de sortie : 1 si des fichiers sont manqués, dupliqués, orphelins ou obsolètes ; 2 si
+certains étaient encore en file à l'expiration de --settle (résultat incomplet) ; 0 sinon.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+
+# Isoler ProgramData avant d'importer l'application : les chemins sont calculés à l'import
+WORK_DIR = tempfile.mkdtemp(prefix="audiodrivesync_soak_")
+os.environ["PROGRAMDATA"] = WORK_DIR
+
+import httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaUploadProgress
+import metrics
+from accounts import account_pool
+from connectivity import spool
+from paths import get_config_file
+from watcher import WatcherSupervisor, OBSERVER_TIMEOUT
+
+FOLDER_MIME = "application/vnd.google-apps.folder"
+CATEGORIES = ["epepp", "culte", "priere", "jeunes"]
+
+
+# --- Faux Drive -------------------------------------------------------------
+
+class FakeRequest:
+    """Imite googleapiclient.http.HttpRequest (execute / next_chunk / resumable)."""
+
+    def __init__(self, drive, action, media=None):
+        self.drive = drive
+        self.action = action
+        self.media = media
+        self.resumable = media if media is not None and media.resumable() else None
+        self._progress = 0
+
+    def execute(self):
+        if self.resumable is not None:
+            # Comme HttpRequest.execute : boucle sur next_chunk, sans requête supplémentaire
+            response = None
+            while response is None:
+                _, response = self.next_chunk()
+            return response
+        self.drive.wait_rtt()
+        if self.media is not None:
+            self.drive.transfer(self.media.size())
+        return self.action()
+
+    def next_chunk(self):
+        size = self.media.size()
+        if self._progress == 0:
+            self.drive.wait_rtt()  # ouverture de la session resumable
+        step = min(self.media.chunksize(), size - self._progress)
+        self.drive.wait_rtt()
+        self.drive.transfer(step)
+        self._progress += step
+        if self._progress >= size:
+            return None, self.action()
+        return MediaUploadProgress(self._progress, size), None
+
+
+class FakeFiles:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q, **kwargs):
+        parent = q.split("'")[1]
+        name = q.split("name='")[1].split("'")[0]
+
+        def action():
+            with self.drive.lock:
+                return {'files': [{'id': f['id']} for f in self.drive.files.values()
+                                  if f['mimeType'] == FOLDER_MIME and f['name'] == name and parent in f['parents']]}
+        return FakeRequest(self.drive, action)
+
+    def create(self, body, media_body=None, **kwargs):
+        def action():
+            return {'id': self.drive.add_file(body, media_body)}
+        return FakeRequest(self.drive, action, media_body)
+
+    def get(self, fileId, **kwargs):
+        def action():
+            f = self.drive.lookup(fileId)
+            return {'id': f['id'], 'name': f['name'], 'parents': list(f['parents']),
+                    'md5Checksum': f.get('md5'), 'trashed': False}
+        return FakeRequest(self.drive, action)
+
+    def update(self, fileId, body=None, media_body=None, addParents=None, removeParents=None, **kwargs):
+        def action():
+            return {'id': self.drive.update_file(fileId, body, media_body, addParents, removeParents)}
+        return FakeRequest(self.drive, action, media_body)
+
+    def delete(self, fileId, **kwargs):
+        def action():
+            self.drive.lookup(fileId)
+            with self.drive.lock:
+                del self.drive.files[fileId]
+            return ''
+        return FakeRequest(self.drive, action)
+
+
+class FakeDrive:
+    """Stand-in du service Drive v3 : stockage en mémoire et journal horodaté des écritures."""
+
+    def __init__(self, rtt, bandwidth):
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        self.lock = threading.Lock()
+        self.files = {'root': {'id': 'root', 'name': 'root', 'mimeType': FOLDER_MIME, 'parents': []}}
+        self.events = []
+        self._next_id = 0
+
+    def wait_rtt(self):
+        if self.rtt:
+            time.sleep(self.rtt)
+
+    def transfer(self, size):
+        if self.bandwidth:
+            time.sleep(size / self.bandwidth)
+
+    def lookup(self, file_id):
+        with self.lock:
+            f = self.files.get(file_id)
+        if f is None:
+            raise HttpError(httplib2.Response({'status': 404}), b'{"error": {"message": "File not found"}}')
+        return f
+
+    @staticmethod
+    def _content_md5(media):
+        return hashlib.md5(media.getbytes(0, media.size())).hexdigest()
+
+    def add_file(self, body, media):
+        with self.lock:
+            self._next_id += 1
+            file_id = f"fake{self._next_id}"
+            f = {'id': file_id, 'name': body['name'], 'parents': list(body.get('parents', ['root'])),
+                 'mimeType': body.get('mimeType', 'audio/mpeg')}
+            if media is not None:
+                f['md5'] = self._content_md5(media)
+                f['size'] = media.size()
+                self.events.append({'time': time.time(), 'kind': 'create', 'id': file_id,
+                                    'name': f['name'], 'md5': f['md5']})
+            self.files[file_id] = f
+        return file_id
+
+    def update_file(self, file_id, body, media, add_parents, remove_parents):
+        f = self.lookup(file_id)
+        with self.lock:
+            if body and 'name' in body:
+                f['name'] = body['name']
+            if remove_parents:
+                f['parents'] = [p for p in f['parents'] if p not in remove_parents.split(',')]
+            if add_parents:
+                f['parents'].append(add_parents)
+            kind = 'metadata'
+            if media is not None:
+                f['md5'] = self._content_md5(media)
+                f['size'] = media.size()
+                kind = 'revision'
+            self.events.append({'time': time.time(), 'kind': kind, 'id': file_id,
+                                'name': f['name'], 'md5': f.get('md5')})
+        return file_id
+
+    def content_files(self):
+        with self.lock:
+            return [dict(f) for f in self.files.values() if f['mimeType'] != FOLDER_MIME]
+
+
+class FakeDriveService:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def files(self):
+        return FakeFiles(self.drive)
+
+
+# --- Générateur de charge ---------------------------------------------------
+
+class LoadGenerator:
+    """Écrit des fichiers synthétiques selon un mélange d'opérations pondéré."""
+
+    def __init__(self, folder, args, stop_flag):
+        self.folder = folder
+        self.args = args
+        self.stop_flag = stop_flag
+        self.random = random.Random(args.seed)
+        self.logical = {}    # chemin final → {'close_time', 'md5', 'size', 'kind'}
+        self.renames = []    # {'time', 'old', 'new', 'md5'}
+        self.busy = set()    # copies en attente de modification : ni renommées ni recopiées
+        self.lock = threading.Lock()
+        self._counter = 0
+        self._threads = []
+
+    def _new_path(self, month=6):
+        self._counter += 1
+        category = self.random.choice(CATEGORIES)
+        return os.path.join(self.folder, f"soak_2024_{month:02d}_{category}_{self._counter:05d}.mp3")
+
+    def _size(self):
+        return self.random.randint(self.args.min_size, self.args.max_size)
+
+    def _record(self, path, content, kind):
+        with self.lock:
+            self.logical[path] = {'close_time': time.time(), 'md5': hashlib.md5(content).hexdigest(),
+                                  'size': len(content), 'kind': kind}
+
+    def write_fast(self, kind="fast"):
+        path = self._new_path()
+        content = os.urandom(self._size())
+        with open(path, 'wb') as f:
+            f.write(content)
+        self._record(path, content, kind)
+
+    def write_slow(self):
+        """Enregistrement en cours : le fichier grossit pendant plusieurs cycles de polling."""
+        path = self._new_path()
+        content = os.urandom(self._size())
+        steps = max(1, int(self.args.slow_seconds))
+        chunk = max(1, len(content) // steps)
+
+        def writer():
+            with open(path, 'wb') as f:
+                for start in range(0, len(content), chunk):
+                    f.write(content[start:start + chunk])
+                    f.flush()
+                    if self.stop_flag.wait(1):
+                        break
+            self._record(path, content, "slow")
+
+        thread = threading.Thread(target=writer, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def burst(self):
+        for _ in range(self.args.burst_size):
+            self.write_fast("burst")
+
+    def rename(self, confirmed):
+        candidates = self._settled(confirmed)
+        if not candidates:
+            return self.write_fast()
+        old = self.random.choice(candidates)
+        self._counter += 1
+        new = os.path.join(self.folder, f"soak_2024_07_{self.random.choice(CATEGORIES)}_{self._counter:05d}.mp3")
+        os.rename(old, new)
+        with self.lock:
+            entry = self.logical.pop(old)
+            self.logical[new] = entry
+            self.renames.append({'time': time.time(), 'old': old, 'new': new, 'md5': entry['md5']})
+
+    def _settled(self, confirmed):
+        with self.lock:
+            return [p for p in self.logical if p in confirmed and p not in self.busy and os.path.exists(p)]
+
+    def copy_edit(self, confirmed):
+        """Copie d'un fichier déjà envoyé, puis modification de la copie seule.
+
+        L'original doit garder son contenu sur Drive et la copie obtenir son propre fichier.
+        """
+        candidates = self._settled(confirmed)
+        if not candidates:
+            return self.write_fast()
+        source = self.random.choice(candidates)
+        copy = self._new_path(month=8)
+        content = os.urandom(self._size())
+        shutil.copyfile(source, copy)
+        with self.lock:
+            self.logical[copy] = dict(self.logical[source], close_time=time.time(), kind="copy")
+            self.busy.add(copy)
+
+        def editor():
+            try:
+                if self.stop_flag.wait(self.args.copy_edit_delay):
+                    return
+                with open(copy, 'wb') as f:
+                    f.write(content)
+                self._record(copy, content, "copy_edit")
+            finally:
+                with self.lock:
+                    self.busy.discard(copy)
+
+        thread = threading.Thread(target=editor, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def run(self, duration, confirmed_paths):
+        operations = [(self.write_fast, self.args.weight_fast), (self.write_slow, self.args.weight_slow),
+                      (self.burst, self.args.weight_burst),
+                      (lambda: self.rename(confirmed_paths()), self.args.weight_rename),
+                      (lambda: self.copy_edit(confirmed_paths()), self.args.weight_copy)]
+        actions = [op for op, _ in operations]
+        weights = [w for _, w in operations]
+        interval = 60.0 / self.args.rate
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline and not self.stop_flag.is_set():
+            self.random.choices(actions, weights)[0]()
+            self.stop_flag.wait(self.random.expovariate(1 / interval))
+        for thread in self._threads:
+            thread.join()
+
+
+# --- Mesures ----------------------------------------------------------------
+
+def read_rss():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class ResourceSampler(threading.Thread):
+    def __init__(self, supervisor, interval=1.0):
+        super().__init__(name="SoakSampler", daemon=True)
+        self.supervisor = supervisor
+        self.interval = interval
+        self.samples = []
+        self.stop_flag = threading.Event()
+
+    def run(self):
+        start = time.monotonic()
+        last_cpu, last_time = time.process_time(), start
+        while not self.stop_flag.wait(self.interval):
+            now, cpu = time.monotonic(), time.process_time()
+            self.samples.append({
+                't': round(now - start, 1),
+                'cpu_pct': round(100 * (cpu - last_cpu) / max(now - last_time, 1e-6), 1),
+                'rss': read_rss(),
+                'queue_depth': self.supervisor.pending_count(),
+                'spool_depth': len(spool),
+                'threads': threading.active_count(),
+            })
+            last_cpu, last_time = cpu, now
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    low, high = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def pending_paths(supervisor):
+    """Fichiers encore en cours de traitement : file de l'observer, handler, spool, envoi en cours."""
+    paths = set()
+    observer, handler = supervisor.observer, supervisor.handler
+    if observer is not None:
+        with observer.event_queue.mutex:
+            queued = [entry[0] for entry in observer.event_queue.queue if isinstance(entry, tuple)]
+        for event in queued + list(supervisor._carried_events):
+            paths.add(getattr(event, 'dest_path', None) or event.src_path)
+    if handler is not None:
+        paths.update(list(handler.processing_files))
+        paths.update(list(handler.pending_modifications))
+    paths.update(entry['path'] for entry in list(spool.entries))
+    paths.update(list(metrics._transfers))
+    return {os.path.normcase(os.path.abspath(p)) for p in paths if p}
+
+
+def analyse(generator, drive, samples, pending=()):
+    """`pending` : chemins encore en file à l'expiration de --settle, comptés à part des manqués."""
+    events = drive.events
+    content_files = drive.content_files()
+    by_name = {}
+    for f in content_files:
+        by_name.setdefault(f['name'], []).append(f)
+
+    latencies, missed, still_pending, stale_names = [], [], [], []
+    for path, info in generator.logical.items():
+        name = os.path.basename(path)
+        # Le fichier Drive portant ce nom doit avoir le contenu local final (ni écrasé, ni obsolète)
+        drive_file = next((f for f in by_name.get(name, []) if f.get('md5') == info['md5']), None)
+        if drive_file is None:
+            if os.path.normcase(os.path.abspath(path)) in pending:
+                still_pending.append(name)
+            elif name in by_name or any(e['md5'] == info['md5'] for e in events):
+                stale_names.append(name)
+            else:
+                missed.append(name)
+            continue
+        # Confirmation propre à ce fichier Drive : une copie non modifiée partage le md5 de sa source
+        confirmed = [e['time'] for e in events if e['id'] == drive_file['id'] and e['md5'] == info['md5']
+                     and e['kind'] in ('create', 'revision')]
+        latencies.append(max(0.0, min(confirmed) - info['close_time']))
+
+    rename_latencies = []
+    for rename in generator.renames:
+        done = [e['time'] for e in events
+                if e['kind'] == 'metadata' and e['name'] == os.path.basename(rename['new']) and e['time'] >= rename['time']]
+        if done:
+            rename_latencies.append(min(done) - rename['time'])
+
+    # Un seul fichier Drive par fichier logique, et aucun fichier Drive sans fichier logique
+    logical_names = {os.path.basename(path) for path in generator.logical}
+    duplicates = sum(len(files) - 1 for name, files in by_name.items() if name in logical_names)
+    # Ancien nom d'un renommage encore en file : pas un orphelin, le renommage est simplement en attente
+    renaming = {os.path.basename(r['old']) for r in generator.renames
+                if os.path.normcase(os.path.abspath(r['new'])) in pending}
+    orphans = sorted(name for name in by_name if name not in logical_names and name not in renaming)
+
+    cpu = [s['cpu_pct'] for s in samples]
+    rss = [s['rss'] for s in samples if s['rss']]
+    summary = lambda values: {p: (round(percentile(values, n), 3) if values else None)
+                              for p, n in (("p50", 50), ("p90", 90), ("p95", 95), ("p99", 99), ("max", 100))}
+    return {
+        'files': len(generator.logical),
+        'renames': len(generator.renames),
+        'copies': sum(1 for info in generator.logical.values() if info['kind'] in ('copy', 'copy_edit')),
+        'latency_s': summary(latencies),
+        'rename_latency_s': summary(rename_latencies),
+        'missed': len(missed),
+        'missed_files': missed,
+        'pending': len(still_pending),
+        'pending_files': still_pending,
+        'duplicates': duplicates,
+        'orphans': len(orphans),
+        'orphan_files': orphans,
+        'stale_names': len(stale_names),
+        'stale_files': stale_names,
+        'drive_files': len(content_files),
+        'uploads': sum(1 for e in events if e['kind'] in ('create', 'revision')),
+        'metadata_updates': sum(1 for e in events if e['kind'] == 'metadata'),
+        'cpu_pct': {'mean': round(sum(cpu) / len(cpu), 1) if cpu else None, 'max': max(cpu, default=None)},
+        'rss_bytes': {'start': rss[0] if rss else None, 'end': rss[-1] if rss else None,
+                      'max': max(rss, default=None)},
+    }
+
+
+def print_report(results, previous=None):
+    def fmt(value):
+        return "-" if value is None else f"{value:.3f}"
+
+    print("\n=== Résultats du test d'endurance ===")
+    print(f"Fichiers : {results['files']}  renommages : {results['renames']}  copies : {results['copies']}  "
+          f"envois : {results['uploads']}  mises à jour de métadonnées : {results['metadata_updates']}")
+    for key, label in (("latency_s", "Latence fermeture → confirmation"), ("rename_latency_s", "Latence renommage")):
+        stats = results[key]
+        line = "  ".join(f"{p} {fmt(v)}s" for p, v in stats.items())
+        if previous and key in previous:
+            deltas = [f"{p} {v - previous[key][p]:+.3f}s" for p, v in stats.items()
+                      if v is not None and previous[key].get(p) is not None]
+            line += f"   (Δ {'  '.join(deltas)})"
+        print(f"{label} : {line}")
+    print(f"Manqués : {results['missed']}  dupliqués : {results['duplicates']}  orphelins : {results['orphans']}  "
+          f"noms obsolètes ou contenus écrasés : {results['stale_names']}")
+    if results['pending']:
+        print(f"Encore en file à l'expiration de --settle (ni manqués ni vérifiés) : {results['pending']}")
+    for key, label in (("missed_files", "Manqués"), ("pending_files", "En file"), ("orphan_files", "Orphelins"),
+                       ("stale_files", "Obsolètes")):
+        if results[key]:
+            print(f"  {label} : {', '.join(results[key][:10])}")
+    rss = results['rss_bytes']
+    print(f"CPU moyen {results['cpu_pct']['mean']} %, max {results['cpu_pct']['max']} %  —  "
+          f"RSS {rss['start']} → {rss['end']} octets (max {rss['max']})")
+
+
+# --- Programme principal ----------------------------------------------------
+
+def quiet_loggers(verbose):
+    if verbose:
+        return
+    for name in ("watcher", "uploader", "connectivity", "metrics", "profiler", "retention", "accounts", "auth"):
+        for handler in logging.getLogger(name).handlers:
+            if type(handler) is logging.StreamHandler:
+                handler.setLevel(logging.WARNING)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=300, help="durée de génération de charge (s)")
+    parser.add_argument("--settle", type=float, default=120, help="attente maximale des derniers envois (s)")
+    parser.add_argument("--rate", type=float, default=12, help="opérations par minute")
+    parser.add_argument("--min-size", type=int, default=64 * 1024)
+    parser.add_argument("--max-size", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--burst-size", type=int, default=5)
+    parser.add_argument("--slow-seconds", type=float, default=15, help="durée d'un enregistrement lent")
+    parser.add_argument("--weight-fast", type=float, default=5)
+    parser.add_argument("--weight-slow", type=float, default=2)
+    parser.add_argument("--weight-burst", type=float, default=1)
+    parser.add_argument("--weight-rename", type=float, default=1)
+    parser.add_argument("--weight-copy", type=float, default=1, help="copie d'un fichier envoyé puis modification")
+    parser.add_argument("--copy-edit-delay", type=float, default=8, help="délai avant modification de la copie (s)")
+    parser.add_argument("--rtt", type=float, default=0.05, help="RTT simulé du faux Drive (s)")
+    parser.add_argument("--bandwidth", type=float, default=20 * 1024 * 1024, help="débit simulé (octets/s)")
+    parser.add_argument("--debounce", type=float, default=3, help="modified_debounce du watcher (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="fichier de résultats JSON")
+    parser.add_argument("--compare", help="résultats JSON d'une exécution précédente")
+    parser.add_argument("--keep", action="store_true", help="conserver le dossier de travail")
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    quiet_loggers(args.verbose)
+    local_folder = os.path.join(WORK_DIR, "watched")
+    os.makedirs(local_folder)
+    with open(get_config_file(), 'w', encoding='utf-8') as f:
+        json.dump({'local_folder': local_folder, 'drive_folder': 'SoakTest',
+                   'modified_debounce': args.debounce, 'spool_drain_interval': 1}, f)
+
+    drive = FakeDrive(args.rtt, args.bandwidth)
+    account_pool.configure([])
+    account_pool.primary._service = FakeDriveService(drive)
+
+    supervisor = WatcherSupervisor(config_file=get_config_file())
+    supervisor_thread = threading.Thread(target=supervisor.run, name="SoakSupervisor", daemon=True)
+    supervisor_thread.start()
+    sampler = ResourceSampler(supervisor)
+    sampler.start()
+
+    stop_flag = threading.Event()
+    generator = LoadGenerator(local_folder, args, stop_flag)
+
+    def confirmed_paths():
+        """Fichiers logiques présents sur Drive sous leur nom, avec leur contenu final."""
+        on_drive = {(f['name'], f.get('md5')) for f in drive.content_files()}
+        with generator.lock:
+            return {p for p, info in generator.logical.items() if (os.path.basename(p), info['md5']) in on_drive}
+
+    print(f"Dossier de travail : {WORK_DIR}")
+    print(f"Génération de charge pendant {args.duration:.0f}s ({args.rate} opérations/min)...")
+    try:
+        time.sleep(2 * OBSERVER_TIMEOUT)  # laisser l'observer prendre son premier instantané
+        generator.run(args.duration, confirmed_paths)
+
+        print("Attente des derniers envois...")
+        deadline = time.monotonic() + args.settle
+        while time.monotonic() < deadline:
+            with generator.lock:
+                expected = set(generator.logical)
+            if expected <= confirmed_paths() and supervisor.pending_count() == 0:
+                break
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Interrompu, analyse des résultats partiels...")
+        stop_flag.set()
+    finally:
+        pending = pending_paths(supervisor)
+        supervisor.stop()
+        supervisor_thread.join(timeout=30)
+        sampler.stop_flag.set()
+        sampler.join()
+
+    results = analyse(generator, drive, sampler.samples, pending)
+    results['parameters'] = {k: v for k, v in vars(args).items() if k not in ("json", "compare", "keep", "verbose")}
+    results['date'] = time.strftime("%Y-%m-%d %H:%M:%S")
+    results['samples'] = sampler.samples
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    print_report(results, previous)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if not args.keep:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+    failed = results['missed'] or results['duplicates'] or results['orphans'] or results['stale_names']
+    if failed:
+        return 1
+    # Fichiers encore en file : ni échec ni réussite, augmenter --settle
+    return 2 if results['pending'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,12 +2,19 @@
 import os
 import hashlib
 import json
+import re
 import logging
+import threading
+import time
 from googleapiclient.http import MediaFileUpload
 from googleapiclient.errors import HttpError
-from drive_auth import authenticate_drive
+from accounts import account_pool, quota_error_reason, QUOTA_COOLDOWN
+from drive_auth import AuthorizationRequired
 from logger_utils import setup_logger
-from paths import get_uploaded_db
+import metrics
+from profiler import profile_call
+from connectivity import drive_breaker, spool, is_connectivity_error
+from paths import get_uploaded_db, get_path_index_db
 
 # --- Initialisation logging robuste ---
 uploader_logger = setup_logger("uploader", "uploader.log")
@@ -15,24 +22,143 @@ uploader_logger.info("=== uploader logger initialisé, fichier ===")
 
 APP_NAME = "AudioDriveSync"
 UPLOAD_DB = get_uploaded_db()
+PATH_INDEX_DB = get_path_index_db()
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # taille de chunk tant que le lien n'a pas été mesuré
 
+# --- Stratégie d'envoi selon la taille ---
+MULTIPART_THRESHOLD = 5 * 1024 * 1024   # en dessous : une seule requête multipart (limite Drive : 5 Mo)
+CHUNK_ALIGNMENT = 256 * 1024            # Drive exige des chunks multiples de 256 Ko
+MIN_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 128 * 1024 * 1024
+TARGET_CHUNK_SECONDS = 8                # durée visée par chunk (progression, coût d'une reprise)
+RTT_OVERHEAD_FACTOR = 20                # un chunk doit durer au moins 20 RTT
 
-def load_uploaded_db():
+# Cache (dossier parent, nom) → ID des dossiers Drive, conservé entre redémarrages du watcher
+folder_cache = {}
+
+# Un seul envoi à la fois : observer, minuteurs de modification et vidange du spool partagent le ledger
+upload_lock = threading.Lock()
+
+
+class LinkEstimator:
+    """Moyennes glissantes du RTT et du débit observés vers Drive."""
+
+    def __init__(self, smoothing=0.3):
+        self.smoothing = smoothing
+        self.rtt = None
+        self.throughput = None
+        self._lock = threading.Lock()
+
+    def _blend(self, current, sample):
+        return sample if current is None else current + self.smoothing * (sample - current)
+
+    def observe_rtt(self, seconds):
+        with self._lock:
+            self.rtt = self._blend(self.rtt, seconds)
+
+    def observe_transfer(self, size, seconds):
+        if size <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            self.throughput = self._blend(self.throughput, size / seconds)
+
+    def chunk_size(self):
+        with self._lock:
+            rtt, throughput = self.rtt, self.throughput
+        if throughput is None:
+            return UPLOAD_CHUNK_SIZE
+        size = throughput * max(TARGET_CHUNK_SECONDS, (rtt or 0) * RTT_OVERHEAD_FACTOR)
+        size = int(size) // CHUNK_ALIGNMENT * CHUNK_ALIGNMENT
+        return max(MIN_CHUNK_SIZE, min(size, MAX_CHUNK_SIZE))
+
+
+link_stats = LinkEstimator()
+
+
+# Ledger et index des chemins gardés en mémoire pendant que le watcher tourne (open_ledger) ;
+# chaque lecture rend une copie, chaque sauvegarde remplace la version en mémoire et le fichier.
+_ledger = None
+_path_index = None
+
+
+def _read_json(path, label):
     try:
-        if os.path.exists(UPLOAD_DB):
-            with open(UPLOAD_DB, 'r') as f:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
                 return json.load(f)
     except (json.JSONDecodeError, IOError) as e:
-        uploader_logger.error(f"Erreur lors du chargement de la base de données : {e}")
+        uploader_logger.error(f"Erreur lors du chargement de {label} : {e}")
     return {}
 
 
-def save_uploaded_db(data):
+def _write_json(path, data, label):
     try:
-        with open(UPLOAD_DB, 'w') as f:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
     except IOError as e:
-        uploader_logger.error(f"Erreur lors de la sauvegarde de la base de données : {e}")
+        uploader_logger.error(f"Erreur lors de la sauvegarde de {label} : {e}")
+
+
+def open_ledger():
+    """Charge une fois le ledger et l'index des chemins ; appelé par le superviseur du watcher."""
+    global _ledger, _path_index
+    with upload_lock:
+        _ledger = _read_json(UPLOAD_DB, "la base de données")
+        _path_index = _read_json(PATH_INDEX_DB, "l'index des chemins")
+    uploader_logger.info(f"Ledger chargé en mémoire : {len(_ledger)} contenus, {len(_path_index)} chemins")
+
+
+def close_ledger():
+    """Libère le ledger en mémoire, sans attendre l'envoi en cours.
+
+    Chaque sauvegarde écrit aussi le fichier : un envoi qui se termine après coup l'enregistre
+    sur disque (save_* ignorent la copie en mémoire une fois celle-ci libérée).
+    """
+    global _ledger, _path_index
+    _ledger = None
+    _path_index = None
+
+
+def load_uploaded_db():
+    """Ledger hash → {'name', 'id', 'account'} (copie ; à modifier sous upload_lock puis sauvegarder)."""
+    ledger = _ledger
+    if ledger is not None:
+        return dict(ledger)
+    return _read_json(UPLOAD_DB, "la base de données")
+
+
+def save_uploaded_db(data):
+    global _ledger
+    if _ledger is not None:
+        _ledger = dict(data)
+    _write_json(UPLOAD_DB, data, "la base de données")
+
+
+def path_key(file_path):
+    return os.path.normcase(os.path.abspath(file_path))
+
+
+def load_path_index():
+    """Index chemin local → {'hash', 'id', 'name', 'uploaded_at', 'account'} du fichier Drive correspondant."""
+    index = _path_index
+    if index is not None:
+        return dict(index)
+    return _read_json(PATH_INDEX_DB, "l'index des chemins")
+
+
+def save_path_index(data):
+    global _path_index
+    if _path_index is not None:
+        _path_index = dict(data)
+    _write_json(PATH_INDEX_DB, data, "l'index des chemins")
+
+
+def linked_paths(index, drive_id, exclude=None):
+    """Chemins locaux encore présents liés à ce fichier Drive (hors `exclude`)."""
+    return [path for path, entry in index.items()
+            if entry.get('id') == drive_id and path != exclude and os.path.exists(path)]
 
 
 def get_file_hash(file_path):
@@ -57,14 +183,27 @@ def parse_audio_filename(filename):
     return None, None, None, None
 
 
+def execute_metadata(request):
+    """Exécute une requête sans contenu en mesurant le RTT vers Drive."""
+    start = time.monotonic()
+    response = request.execute()
+    link_stats.observe_rtt(time.monotonic() - start)
+    return response
+
+
 def ensure_drive_path(service, root_folder_id, path_parts):
     parent_id = root_folder_id
     for part in path_parts:
-        results = service.files().list(
+        cached = folder_cache.get((parent_id, part))
+        if cached:
+            parent_id = cached
+            continue
+        child_of = parent_id
+        results = execute_metadata(service.files().list(
             q=f"'{parent_id}' in parents and name='{part}' and mimeType='application/vnd.google-apps.folder' and trashed=false",
             spaces='drive',
-            fields='files(id, name)'
-        ).execute()
+            fields='files(id)'
+        ))
         files = results.get('files', [])
         if files:
             parent_id = files[0]['id']
@@ -76,12 +215,281 @@ def ensure_drive_path(service, root_folder_id, path_parts):
             }
             folder = service.files().create(body=file_metadata, fields='id').execute()
             parent_id = folder['id']
+        folder_cache[(child_of, part)] = parent_id
     return parent_id
 
 
+def build_media(file_path):
+    """Multipart pour les petits fichiers, resumable avec chunk adapté au lien sinon."""
+    if os.path.getsize(file_path) < MULTIPART_THRESHOLD:
+        return MediaFileUpload(file_path, resumable=False)
+    return MediaFileUpload(file_path, chunksize=link_stats.chunk_size(), resumable=True)
+
+
+def resolve_root_folder(service, drive_root_name_or_url):
+    """ID du dossier racine : lien Drive fourni, ou dossier nommé à la racine (créé si besoin)."""
+    # Si un lien Drive est fourni
+    if "drive.google.com" in drive_root_name_or_url:
+        match = re.search(r"/folders/([a-zA-Z0-9_-]+)", drive_root_name_or_url)
+        if not match:
+            uploader_logger.error("Lien Drive invalide.")
+            return None
+        return match.group(1)
+
+    cached = folder_cache.get(('root', drive_root_name_or_url))
+    if cached:
+        return cached
+
+    # Vérifier si le dossier existe déjà à la racine
+    results = execute_metadata(service.files().list(
+        q=f"'root' in parents and name='{drive_root_name_or_url}' and mimeType='application/vnd.google-apps.folder' and trashed=false",
+        spaces='drive',
+        fields='files(id)'
+    ))
+    files = results.get('files', [])
+    if files:
+        root_folder_id = files[0]['id']
+    else:
+        # Créer le dossier racine
+        file_metadata = {
+            'name': drive_root_name_or_url,
+            'mimeType': 'application/vnd.google-apps.folder',
+            'parents': ['root']
+        }
+        folder = service.files().create(body=file_metadata, fields='id').execute()
+        root_folder_id = folder['id']
+    folder_cache[('root', drive_root_name_or_url)] = root_folder_id
+    return root_folder_id
+
+
+def execute_upload(request, file_path):
+    """Exécute un envoi (multipart ou resumable chunk par chunk) en publiant la progression."""
+    size = os.path.getsize(file_path)
+    metrics.begin_transfer(file_path, size)
+    response = None
+    try:
+        if request.resumable is None:
+            # Durée dominée par la latence : seule la taille des chunks resumable dépend du débit mesuré
+            response = request.execute()
+        else:
+            sent = 0
+            while response is None:
+                start = time.monotonic()
+                status, response = request.next_chunk()
+                progress = status.resumable_progress if status else size
+                link_stats.observe_transfer(progress - sent, time.monotonic() - start)
+                sent = progress
+                metrics.update_transfer(file_path, progress)
+    except Exception:
+        metrics.end_transfer(file_path, success=False)
+        raise
+    metrics.end_transfer(file_path, success=True)
+    return response
+
+
+def hold_for_quota(file_path, drive_root_name_or_url, src_path=None, not_before=None):
+    """Met le fichier en attente sans le réessayer avant la fin de la pause de quota."""
+    uploader_logger.warning(f"Aucun compte Drive n'a de quota disponible, fichier mis en attente : {file_path}")
+    not_before = min(not_before or account_pool.next_available(), time.time() + QUOTA_COOLDOWN)
+    spool.add(file_path, drive_root_name_or_url, src_path, not_before=not_before)
+
+
+def shared_folder_visible(folder_id):
+    """True si le compte principal voit le dossier (un 404 vient alors du compte d'envoi)."""
+    try:
+        execute_metadata(account_pool.primary.service.files().get(fileId=folder_id, fields='id'))
+        return True
+    except HttpError:
+        return False
+
+
+def hold_unauthorized(error, file_path, drive_root_name_or_url, src_path=None):
+    """Compte propriétaire sans jeton valide : le fichier attend que le compte soit réautorisé."""
+    uploader_logger.warning(f"{error}, fichier mis en attente : {file_path}")
+    spool.add(file_path, drive_root_name_or_url, src_path, not_before=time.time() + QUOTA_COOLDOWN)
+
+
+def handle_drive_error(error, file_path, drive_root_name_or_url, src_path=None):
+    """Alimente le disjoncteur et met le fichier en attente si l'erreur est une panne ou un quota.
+
+    `src_path` : renommage local en cours, mis en attente comme déplacement et non comme envoi.
+    """
+    if quota_error_reason(error):
+        # Quota épuisé sur tous les comptes : Drive répond, inutile d'ouvrir le disjoncteur
+        hold_for_quota(file_path, drive_root_name_or_url, src_path)
+    elif is_connectivity_error(error):
+        drive_breaker.record_failure(error)
+        spool.add(file_path, drive_root_name_or_url, src_path)
+
+
+def push_revision(account, file_path, known, file_hash, uploaded):
+    """Envoie le nouveau contenu comme révision du fichier Drive existant.
+
+    Retourne False si le fichier n'existe plus sur Drive (il faut alors le recréer).
+    """
+    filename = os.path.basename(file_path)
+    media = build_media(file_path)
+    request = account.service.files().update(fileId=known['id'], media_body=media, fields='id')
+    try:
+        execute_upload(request, file_path)
+    except HttpError as e:
+        if e.resp.status == 404:
+            uploader_logger.info(f"Fichier supprimé du Drive, réimportation de {filename}...")
+            return False
+        raise
+    drive_breaker.record_success()
+    account_pool.record_upload(account, os.path.getsize(file_path))
+
+    # L'ancien hash ne décrit plus le contenu de ce fichier Drive
+    if uploaded.get(known['hash'], {}).get('id') == known['id']:
+        del uploaded[known['hash']]
+    uploaded[file_hash] = {'name': filename, 'id': known['id'], 'account': account.name}
+    save_uploaded_db(uploaded)
+
+    index = load_path_index()
+    index[path_key(file_path)] = {'hash': file_hash, 'id': known['id'], 'name': filename,
+                                  'uploaded_at': time.time(), 'account': account.name}
+    save_path_index(index)
+    uploader_logger.info(f"Nouvelle révision envoyée : {filename}")
+    return True
+
+
+def move_file(src_path, dest_path, drive_root_name_or_url):
+    """Renommage/déplacement local : met à jour nom et dossier sur Drive sans renvoyer le contenu."""
+    with upload_lock:
+        return profile_call(_move_file, src_path, dest_path, drive_root_name_or_url)
+
+
+def refresh_folders_after_404(error, file_path, folders_refreshed):
+    """404 sur un dossier : le cache a pu désigner un dossier supprimé sur Drive.
+
+    Retourne True s'il faut réessayer (une seule fois, cache vidé) ; sinon l'échec est définitif.
+    """
+    if not isinstance(error, HttpError) or error.resp.status != 404:
+        return False
+    if folders_refreshed:
+        uploader_logger.error(f"Dossier Drive introuvable, même après actualisation du cache : {file_path}")
+        return False
+    uploader_logger.info(f"Dossier Drive introuvable, actualisation du cache des dossiers : {file_path}")
+    folder_cache.clear()
+    return True
+
+
+def _move_file(src_path, dest_path, drive_root_name_or_url, folders_refreshed=False):
+    index = load_path_index()
+    uploaded = load_uploaded_db()
+    file_hash = get_file_hash(dest_path)
+    if file_hash is None:
+        uploader_logger.error(f"Impossible de calculer le hash pour {dest_path}")
+        return
+
+    # Lien chemin → hash → ID Drive ; à défaut, contenu déjà connu du ledger s'il n'appartient
+    # à aucun autre fichier local (sinon c'est une copie, qui a son propre fichier Drive)
+    known = index.get(path_key(src_path))
+    if known is None and file_hash in uploaded \
+            and not linked_paths(index, uploaded[file_hash]['id'], exclude=path_key(dest_path)):
+        known = dict(uploaded[file_hash], hash=file_hash)
+    if known is None:
+        return _upload_file(dest_path, drive_root_name_or_url)
+    if not drive_breaker.allow_request():
+        # Rejoué comme déplacement à la vidange : un envoi conclurait « Déjà sur Drive »
+        spool.add(dest_path, drive_root_name_or_url, src_path)
+        return
+
+    owner = account_pool.owner_of(known)
+    if not owner.available():
+        hold_for_quota(dest_path, drive_root_name_or_url, src_path, not_before=owner.cooldown_until)
+        return
+
+    filename = os.path.basename(dest_path)
+    try:
+        # Arborescence par le compte principal ; le fichier lui-même par le compte qui l'a créé
+        service = account_pool.primary.service
+        try:
+            current = execute_metadata(owner.service.files().get(fileId=known['id'], fields='parents'))
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            drive_breaker.record_success()
+            uploader_logger.info(f"Fichier supprimé du Drive, réimportation de {filename}...")
+            index.pop(path_key(src_path), None)
+            save_path_index(index)
+            return _upload_file(dest_path, drive_root_name_or_url)
+
+        old_parents = current.get('parents', [])
+        tabernacle, year, month, category = parse_audio_filename(filename)
+        if all([tabernacle, year, month, category]):
+            root_folder_id = resolve_root_folder(service, drive_root_name_or_url)
+            if root_folder_id is None:
+                return
+            target_folder_id = ensure_drive_path(service, root_folder_id, [tabernacle, year, month, category])
+        else:
+            logging.warning(f"Nom de fichier invalide pour hiérarchie : {filename}, dossier Drive conservé")
+            target_folder_id = old_parents[0] if old_parents else None
+
+        update_args = {'fileId': known['id'], 'body': {'name': filename}, 'fields': 'id'}
+        if target_folder_id and target_folder_id not in old_parents:
+            update_args['addParents'] = target_folder_id
+            update_args['removeParents'] = ','.join(old_parents)
+        execute_metadata(owner.service.files().update(**update_args))
+        drive_breaker.record_success()
+
+        if known['hash'] in uploaded:
+            uploaded[known['hash']]['name'] = filename
+            save_uploaded_db(uploaded)
+        entry = index.pop(path_key(src_path), None) or dict(known, uploaded_at=time.time())
+        index[path_key(dest_path)] = dict(entry, name=filename)
+        save_path_index(index)
+        uploader_logger.info(f"Renommé/déplacé sur Drive sans réenvoi : {os.path.basename(src_path)} → {filename}")
+
+    except HttpError as e:
+        if not is_connectivity_error(e):
+            drive_breaker.record_success()  # Drive a répondu : la requête d'essai a abouti
+        if refresh_folders_after_404(e, dest_path, folders_refreshed):
+            return _move_file(src_path, dest_path, drive_root_name_or_url, folders_refreshed=True)
+        uploader_logger.error(f"Erreur API Google Drive lors du déplacement : {e}")
+        metrics.record_event("failure", filename, message=f"Erreur API : {e}")
+        handle_drive_error(e, dest_path, drive_root_name_or_url, src_path)
+        return
+    except AuthorizationRequired as e:
+        if account_pool.disable_unauthorized(e):
+            return _move_file(src_path, dest_path, drive_root_name_or_url, folders_refreshed)
+        hold_unauthorized(e, dest_path, drive_root_name_or_url, src_path)
+        return
+    except Exception as e:
+        uploader_logger.error(f"Erreur inattendue lors du déplacement : {e}")
+        metrics.record_event("failure", filename, message=str(e))
+        handle_drive_error(e, dest_path, drive_root_name_or_url, src_path)
+        return
+
+    # Contenu modifié en même temps que le renommage : nouvelle révision
+    if file_hash != known['hash']:
+        _upload_file(dest_path, drive_root_name_or_url)
+
+
 def upload_file(file_path, drive_root_name_or_url):
+    # Profilé sous le verrou : un seul cProfile actif à la fois, et les envois en attente
+    # du verrou au début d'une capture y sont inclus
+    with upload_lock:
+        return profile_call(_upload_file, file_path, drive_root_name_or_url)
+
+
+def _upload_file(file_path, drive_root_name_or_url, folders_refreshed=False):
+    # Drive injoignable : ni authentification, ni hash, ni requête tant que la sonde échoue
+    if not drive_breaker.allow_request():
+        spool.add(file_path, drive_root_name_or_url)
+        return
+
+    account = None            # compte dont une requête de contenu est en cours
+    target_folder_id = None
     try:
-        service = authenticate_drive()
+        # Tous les comptes en pause : inutile de calculer le hash d'un fichier qui ne partira pas
+        if account_pool.choose(os.path.getsize(file_path)) is None:
+            hold_for_quota(file_path, drive_root_name_or_url)
+            return
+
+        # Compte principal : arborescence ; le contenu part sur le compte choisi, puis reste à son propriétaire
+        service = account_pool.primary.service
         uploaded = load_uploaded_db()
         file_hash = get_file_hash(file_path)
         if file_hash is None:
@@ -89,9 +497,23 @@ def upload_file(file_path, drive_root_name_or_url):
             return
 
         filename = os.path.basename(file_path)
+        key = path_key(file_path)
+        index = load_path_index()
+        copy_of = None
         if file_hash in uploaded:
+            # Même contenu qu'un fichier local encore présent : copie, envoyée comme fichier distinct
+            others = linked_paths(index, uploaded[file_hash]['id'], exclude=key)
+            if others:
+                copy_of = others[0]
+                uploader_logger.info(f"Copie de {os.path.basename(copy_of)}, envoi d'un fichier distinct : {file_path}")
+        if file_hash in uploaded and copy_of is None:
             try:
-                service.files().get(fileId=uploaded[file_hash]['id']).execute()
+                owner = account_pool.owner_of(uploaded[file_hash])
+                execute_metadata(owner.service.files().get(fileId=uploaded[file_hash]['id'], fields='id'))
+                drive_breaker.record_success()
+                if key not in index:
+                    index[key] = dict(uploaded[file_hash], hash=file_hash, uploaded_at=time.time())
+                    save_path_index(index)
                 uploader_logger.info(f"Déjà sur Drive : {file_path}")
                 return
             except HttpError as e:
@@ -99,42 +521,33 @@ def upload_file(file_path, drive_root_name_or_url):
                     uploader_logger.info(f"Fichier supprimé du Drive, réimportation...")
                 else:
                     uploader_logger.error(f"Erreur lors de la vérification du fichier : {e}")
+                    handle_drive_error(e, file_path, drive_root_name_or_url)
                     return
 
-        
-       # Si un lien Drive est fourni
-        if "drive.google.com" in drive_root_name_or_url:
-            import re
-            match = re.search(r"/folders/([a-zA-Z0-9_-]+)", drive_root_name_or_url)
-            if not match:
-                uploader_logger.error("Lien Drive invalide.")
-                return
-            root_folder_id = match.group(1)
-        else:
-            # Ici on veut chercher/créer un dossier racine nommé comme drive_root_name_or_url
-            try:
-                # Vérifier si le dossier existe déjà à la racine
-                results = service.files().list(
-                    q=f"'{ 'root' }' in parents and name='{drive_root_name_or_url}' and mimeType='application/vnd.google-apps.folder' and trashed=false",
-                    spaces='drive',
-                    fields='files(id, name)'
-                ).execute()
-                files = results.get('files', [])
-                if files:
-                    root_folder_id = files[0]['id']
-                else:
-                    # Créer le dossier racine
-                    file_metadata = {
-                        'name': drive_root_name_or_url,
-                        'mimeType': 'application/vnd.google-apps.folder',
-                        'parents': ['root']
-                    }
-                    folder = service.files().create(body=file_metadata, fields='id').execute()
-                    root_folder_id = folder['id']
-            except Exception as e:
-                uploader_logger.error(f"Erreur lors de la création du dossier racine : {e}")
+        # Contenu modifié d'un fichier déjà envoyé : nouvelle révision, par le compte qui l'a créé
+        known = index.get(key)
+        if known and known['hash'] != file_hash:
+            owner = account_pool.owner_of(known)
+            if linked_paths(index, known['id'], exclude=key):
+                # Fichier Drive partagé avec un autre chemin local : ne pas écraser son contenu
+                uploader_logger.info(f"Fichier Drive lié à un autre fichier local, envoi d'un fichier distinct : {file_path}")
+            elif not owner.available():
+                hold_for_quota(file_path, drive_root_name_or_url, not_before=owner.cooldown_until)
                 return
+            else:
+                account = owner
+                if push_revision(owner, file_path, known, file_hash, uploaded):
+                    return
+                account = None
 
+        try:
+            root_folder_id = resolve_root_folder(service, drive_root_name_or_url)
+        except Exception as e:
+            uploader_logger.error(f"Erreur lors de la création du dossier racine : {e}")
+            handle_drive_error(e, file_path, drive_root_name_or_url)
+            return
+        if root_folder_id is None:
+            return
 
         # Extraire infos tabernacle, year, month, category
         tabernacle, year, month, category = parse_audio_filename(filename)
@@ -145,23 +558,61 @@ def upload_file(file_path, drive_root_name_or_url):
         path = [tabernacle, year, month, category]
         target_folder_id = ensure_drive_path(service, root_folder_id, path)
 
-        media = MediaFileUpload(file_path, resumable=True)
+        chosen = account_pool.choose(os.path.getsize(file_path))
+        if chosen is None:
+            hold_for_quota(file_path, drive_root_name_or_url)
+            return
+        # Partage avant toute requête du compte choisi
+        account_pool.ensure_shared(chosen, root_folder_id)
+
+        media = build_media(file_path)
         file_metadata = {
             'name': filename,
             'parents': [target_folder_id]
         }
 
-        uploaded_file = service.files().create(
+        account = chosen
+        request = account.service.files().create(
             body=file_metadata,
             media_body=media,
             fields='id'
-        ).execute()
+        )
+        uploaded_file = execute_upload(request, file_path)
+        drive_breaker.record_success()
+        account_pool.record_upload(account, os.path.getsize(file_path))
 
-        uploaded[file_hash] = {'name': filename, 'id': uploaded_file.get('id')}
-        save_uploaded_db(uploaded)
+        if copy_of is None:
+            # Pour une copie, le ledger continue de désigner le fichier Drive de l'original
+            uploaded[file_hash] = {'name': filename, 'id': uploaded_file.get('id'), 'account': account.name}
+            save_uploaded_db(uploaded)
+        index = load_path_index()
+        index[key] = {'hash': file_hash, 'id': uploaded_file.get('id'), 'name': filename,
+                      'uploaded_at': time.time(), 'account': account.name}
+        save_path_index(index)
         uploader_logger.info(f"Uploadé dans {path} : {filename}")
 
     except HttpError as e:
+        if not is_connectivity_error(e):
+            drive_breaker.record_success()  # Drive a répondu : la requête d'essai a abouti
+        # Seules les erreurs des requêtes du compte d'envoi le mettent en pause ou l'écartent
+        if account is not None and quota_error_reason(e) and account_pool.record_quota_error(account, e):
+            uploader_logger.info(f"Quota atteint pour le compte {account.name}, bascule vers un autre compte...")
+            return _upload_file(file_path, drive_root_name_or_url, folders_refreshed)
+        if account is not None and account is not account_pool.primary and e.resp.status == 404 \
+                and target_folder_id and shared_folder_visible(target_folder_id):
+            account_pool.disable(account, f"dossier partagé inaccessible ({e})")
+            return _upload_file(file_path, drive_root_name_or_url, folders_refreshed)
+        if refresh_folders_after_404(e, file_path, folders_refreshed):
+            return _upload_file(file_path, drive_root_name_or_url, folders_refreshed=True)
         uploader_logger.error(f"Erreur API Google Drive : {e}")
+        metrics.record_event("failure", os.path.basename(file_path), message=f"Erreur API : {e}")
+        handle_drive_error(e, file_path, drive_root_name_or_url)
+    except AuthorizationRequired as e:
+        # Compte supplémentaire sans jeton valide : écarté, un autre compte prend le relais
+        if account_pool.disable_unauthorized(e):
+            return _upload_file(file_path, drive_root_name_or_url, folders_refreshed)
+        hold_unauthorized(e, file_path, drive_root_name_or_url)
     except Exception as e:
         uploader_logger.error(f"Erreur inattendue lors de l'upload : {e}")
+        metrics.record_event("failure", os.path.basename(file_path), message=str(e))
+        handle_drive_error(e, file_path, drive_root_name_or_url)
@@ -3,10 +3,17 @@ import time
 import os
 import json
 import threading
-from watchdog.observers.polling import PollingObserver
+from queue import Empty
+from functools import partial
+from watchdog.observers.api import BaseObserver
+from watchdog.observers.polling import PollingEmitter
 from watchdog.events import FileSystemEventHandler
-from uploader import upload_file
+from uploader import upload_file, move_file, folder_cache, open_ledger, close_ledger
+import metrics
+from connectivity import start_spool_drainer, stop_spool_drainer, DRAIN_INTERVAL
 from logger_utils import setup_logger
+from retention import start_retention_worker, stop_retention_worker, notify_uploaded
+from accounts import account_pool
 from paths import get_config_file, get_base_dir
 
 # --- Initialisation logging robuste ---
@@ -15,12 +22,15 @@ watcher_logger.info("=== Watcher logger initialisé ===")
 
 AUDIO_EXTENSIONS = ['.mp3', '.wav', '.ogg', '.flac', '.m4a', '.aac']
 APP_NAME = "AudioDriveSync"
+MODIFIED_DEBOUNCE = 10  # secondes sans modification avant d'envoyer une nouvelle révision
 CONFIG_DIR = get_base_dir()
 CONFIG_FILE = get_config_file()
 
-# --- Variables globales ---
-observer = None
-stop_flag = threading.Event()
+OBSERVER_TIMEOUT = 3
+CONFIG_RETRY_DELAY = 30
+MIN_RESTART_BACKOFF = 2
+MAX_RESTART_BACKOFF = 120
+STABLE_AFTER = 60       # secondes de fonctionnement avant de réinitialiser le backoff
 
 
 class AudioHandler(FileSystemEventHandler):
@@ -28,6 +38,9 @@ class AudioHandler(FileSystemEventHandler):
         self.local_folder = config['local_folder']
         self.drive_folder = config['drive_folder']
         self.processing_files = set()
+        self.modified_debounce = config.get('modified_debounce', MODIFIED_DEBOUNCE)
+        self.pending_modifications = {}
+        self._pending_lock = threading.Lock()
 
     def on_created(self, event):
         if event.is_directory:
@@ -50,88 +63,335 @@ class AudioHandler(FileSystemEventHandler):
                     return
                 watcher_logger.info(f"Nouveau fichier détecté : {filepath} ({file_size} bytes)")
                 upload_file(filepath, self.drive_folder)
+                notify_uploaded(filepath)
             except Exception as e:
                 watcher_logger.error(f"Erreur lors du traitement du fichier {filepath}: {e}")
             finally:
                 self.processing_files.discard(filepath)
 
+    def on_modified(self, event):
+        if event.is_directory:
+            return
+        filepath = event.src_path
+        _, ext = os.path.splitext(filepath)
+        if ext.lower() in AUDIO_EXTENSIONS:
+            self.schedule_revision(filepath)
+
+    def schedule_revision(self, filepath):
+        """Regroupe les modifications rapprochées en un seul envoi de révision."""
+        with self._pending_lock:
+            timer = self.pending_modifications.pop(filepath, None)
+            if timer:
+                timer.cancel()
+            timer = threading.Timer(self.modified_debounce, self.flush_revision, args=(filepath,))
+            timer.daemon = True
+            self.pending_modifications[filepath] = timer
+            timer.start()
+
+    def flush_revision(self, filepath):
+        with self._pending_lock:
+            self.pending_modifications.pop(filepath, None)
+        if filepath in self.processing_files:
+            # Envoi initial encore en cours : réessayer après le prochain délai
+            self.schedule_revision(filepath)
+            return
+        if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+            return
+        self.processing_files.add(filepath)
+        try:
+            watcher_logger.info(f"Fichier modifié détecté : {filepath}")
+            upload_file(filepath, self.drive_folder)
+            notify_uploaded(filepath)
+        except Exception as e:
+            watcher_logger.error(f"Erreur lors du traitement du fichier modifié {filepath}: {e}")
+        finally:
+            self.processing_files.discard(filepath)
+
+    def cancel_pending(self):
+        with self._pending_lock:
+            for timer in self.pending_modifications.values():
+                timer.cancel()
+            self.pending_modifications.clear()
+
     def on_moved(self, event):
         if not event.is_directory:
             filepath = event.dest_path
             _, ext = os.path.splitext(filepath)
             if ext.lower() in AUDIO_EXTENSIONS:
-                watcher_logger.info(f"Fichier déplacé détecté : {filepath}")
+                watcher_logger.info(f"Fichier déplacé détecté : {event.src_path} → {filepath}")
                 time.sleep(1)
-                upload_file(filepath, self.drive_folder)
+                move_file(event.src_path, filepath, self.drive_folder)
+                notify_uploaded(filepath)
 
 
-def start_watcher():
-    """Démarre le watcher basé sur PollingObserver."""
-    global observer
-    try:
-        watcher_logger.info("=== DÉMARRAGE WATCHER (PollingObserver) ===")
+class WarmPollingEmitter(PollingEmitter):
+    """PollingEmitter pouvant repartir de l'instantané du précédent observer.
 
-        if not os.path.exists(CONFIG_FILE):
-            watcher_logger.error(f"Fichier de configuration introuvable : {CONFIG_FILE}")
-            return
+    Les fichiers créés ou modifiés pendant un redémarrage produisent ainsi leurs
+    événements au lieu d'être absorbés par un nouvel instantané.
+    """
 
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+    def __init__(self, *args, seed_snapshot=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._seed_snapshot = seed_snapshot
 
-        path = config['local_folder']
-        if not os.path.exists(path):
-            watcher_logger.error(f"Dossier local introuvable : {path}")
-            return
+    def on_thread_start(self):
+        if self._seed_snapshot is not None:
+            self._snapshot = self._seed_snapshot
+        else:
+            super().on_thread_start()
 
-        watcher_logger.info(f"Configuration chargée - Dossier: {path}")
-        watcher_logger.info(f"Configuration chargée - Drive: {config['drive_folder']}")
 
-        event_handler = AudioHandler(config)
-        observer = PollingObserver(timeout=3)  # 🟢 plus stable, moins sensible aux threads
-        observer.schedule(event_handler, path=path, recursive=False)
-        observer.start()
+class WarmPollingObserver(BaseObserver):
+    def __init__(self, seed_snapshot=None, timeout=OBSERVER_TIMEOUT):
+        super().__init__(partial(WarmPollingEmitter, seed_snapshot=seed_snapshot), timeout=timeout)
 
-        watcher_logger.info(f"PollingObserver démarré — surveillance active sur : {path}")
 
-        while not stop_flag.is_set():
-            time.sleep(1)
+class WatcherSupervisor:
+    """Supervise le PollingObserver et possède les ressources qui survivent à ses redémarrages.
 
-        watcher_logger.info("Signal d'arrêt reçu, arrêt du watcher...")
+    Clients Drive (account_pool), ledger et index des chemins en mémoire, cache des
+    dossiers Drive, handler (minuteurs de modification, fichiers en cours) et workers
+    (vidange du spool, rétention) sont conservés ; seul l'observer est reconstruit,
+    avec un backoff exponentiel.
+    """
 
-    except Exception as e:
-        watcher_logger.error(f"Erreur inattendue dans le watcher : {e}", exc_info=True)
-    finally:
-        cleanup_observer()
+    def __init__(self, config_file=CONFIG_FILE):
+        self.config_file = config_file
+        self.stop_flag = threading.Event()
+        self.config = None
+        self.observer = None
+        self.handler = None
+        self.restarts = 0
+        self.last_recovery = None
+        self._config_mtime = None
+        self._snapshot = None
+        self._carried_events = []   # événements détectés mais pas encore traités à l'arrêt
+        self._emitters = []
+        self._resources_started = False
+        self._lock = threading.RLock()
 
+    # --- Configuration et ressources longues ---
 
-def cleanup_observer():
-    """Arrête proprement le PollingObserver."""
-    global observer
-    if observer:
+    def load_config(self):
+        """Relit la configuration uniquement si le fichier a changé."""
+        try:
+            mtime = os.path.getmtime(self.config_file)
+        except OSError:
+            watcher_logger.error(f"Fichier de configuration introuvable : {self.config_file}")
+            return None
+        if mtime == self._config_mtime:
+            return self.config
+
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        if not os.path.exists(config['local_folder']):
+            watcher_logger.error(f"Dossier local introuvable : {config['local_folder']}")
+            return None
+
+        watcher_logger.info(f"Configuration chargée - Dossier: {config['local_folder']}")
+        watcher_logger.info(f"Configuration chargée - Drive: {config['drive_folder']}")
+        if self.config is not None and config != self.config:
+            watcher_logger.info("Configuration modifiée, réinitialisation des ressources")
+            self.stop_observer()
+            self.stop_resources()
+            if config['local_folder'] != self.config['local_folder']:
+                self._snapshot = None
+                self._carried_events = []
+            if config['drive_folder'] != self.config['drive_folder']:
+                folder_cache.clear()
+        self.config = config
+        self._config_mtime = mtime
+        return config
+
+    def start_resources(self):
+        with self._lock:
+            if self._resources_started:
+                return
+            account_pool.configure(self.config.get('accounts', []))
+            open_ledger()
+            self.handler = AudioHandler(self.config)
+            start_spool_drainer(upload_file, move_file, self.config.get('spool_drain_interval', DRAIN_INTERVAL))
+            start_retention_worker(self.config)
+            metrics.register_gauge("queue_depth", self.pending_count)
+            self._resources_started = True
+
+    def stop_resources(self):
+        with self._lock:
+            if not self._resources_started:
+                return
+            if self.handler:
+                self.handler.cancel_pending()
+            stop_spool_drainer()
+            stop_retention_worker()
+            close_ledger()
+            metrics.unregister_gauge("queue_depth")
+            self.handler = None
+            self._resources_started = False
+
+    # --- Observer ---
+
+    def start_observer(self):
+        with self._lock:
+            path = self.config['local_folder']
+            self.observer = WarmPollingObserver(seed_snapshot=self._snapshot)  # 🟢 plus stable, moins sensible aux threads
+            watch = self.observer.schedule(self.handler, path=path, recursive=False)
+            # Événements hérités du précédent observer : l'instantané repris ne les reproduira pas
+            for event in self._carried_events:
+                self.observer.event_queue.put((event, watch))
+            if self._carried_events:
+                watcher_logger.info(f"{len(self._carried_events)} événement(s) non traité(s) repris")
+            self._carried_events = []
+            # Référence propre : l'observer vide sa liste d'emitters lorsqu'il s'arrête
+            self._emitters = list(self.observer.emitters)
+            self.observer.start()
+            metrics.set_gauge("watcher_state", "running")
+            watcher_logger.info(f"PollingObserver démarré — surveillance active sur : {path}")
+
+    def stop_observer(self):
+        """Arrête proprement le PollingObserver en conservant son dernier instantané.
+
+        Les emitters sont arrêtés avant la lecture de l'instantané ; les événements qu'ils
+        ont déjà produits et que le handler n'a pas encore traités sont conservés pour
+        l'observer suivant, l'instantané repris ne pouvant plus les faire réapparaître.
+        """
+        with self._lock:
+            observer, self.observer = self.observer, None
+        if observer is None:
+            return
         try:
             watcher_logger.info("Arrêt du PollingObserver...")
-            observer.stop()
+            observer.stop()  # arrête et attend aussi les emitters
+            for emitter in self._emitters:
+                self._snapshot = getattr(emitter, '_snapshot', None) or self._snapshot
+            self._emitters = []
             observer.join(timeout=5)
             if observer.is_alive():
                 watcher_logger.warning("PollingObserver ne s'est pas arrêté proprement")
             else:
                 watcher_logger.info("PollingObserver arrêté correctement")
+            self._carry_events(observer)
         except Exception as e:
             watcher_logger.warning(f"Erreur lors de l'arrêt du PollingObserver : {e}")
         finally:
-            observer = None
+            metrics.set_gauge("watcher_state", "stopped")
+
+    def _carry_events(self, observer):
+        queue = observer.event_queue
+        while True:
+            try:
+                entry = queue.get_nowait()
+            except Empty:
+                break
+            if isinstance(entry, tuple):  # hors marqueur d'arrêt du dispatcher
+                self._carried_events.append(entry[0])
+
+    def pending_count(self):
+        """Nombre de fichiers en attente : événements non traités + fichier en cours."""
+        observer, handler = self.observer, self.handler
+        queued = observer.event_queue.qsize() if observer else 0
+        return queued + len(self._carried_events) + (len(handler.processing_files) if handler else 0)
+
+    def observer_healthy(self):
+        """Dispatcher et emitters vivants.
+
+        Un PollingEmitter s'arrête seul lorsque le dossier devient inaccessible, sans
+        arrêter l'observer : la vivacité de l'observer ne suffit pas.
+        """
+        observer = self.observer
+        return (observer is not None and observer.is_alive()
+                and all(emitter.is_alive() for emitter in self._emitters))
+
+    def is_running(self):
+        return self.observer_healthy() and not self.stop_flag.is_set()
+
+    # --- Boucle de supervision ---
+
+    def _record_recovery(self, failed_at):
+        self.restarts += 1
+        self.last_recovery = time.monotonic() - failed_at
+        metrics.inc_counter("watcher_restarts")
+        metrics.set_gauge("watcher_last_recovery_s", round(self.last_recovery, 2))
+        watcher_logger.info(f"Watcher rétabli en {self.last_recovery:.1f}s (redémarrage n°{self.restarts})")
+
+    def run(self):
+        """Bloque jusqu'à stop() en relançant uniquement les éléments défaillants."""
+        watcher_logger.info("=== DÉMARRAGE WATCHER (PollingObserver supervisé) ===")
+        backoff = MIN_RESTART_BACKOFF
+        failed_at = None
+        started_at = None
+        try:
+            while not self.stop_flag.is_set():
+                try:
+                    if self.load_config() is None:
+                        self.stop_flag.wait(CONFIG_RETRY_DELAY)
+                        continue
+                    self.start_resources()
+
+                    if self.observer is not None and not self.observer_healthy():
+                        watcher_logger.warning("PollingObserver ou surveillance du dossier arrêté de façon inattendue")
+                        failed_at = failed_at or time.monotonic()
+                        self.stop_observer()
+                        self.stop_flag.wait(backoff)
+                        backoff = min(backoff * 2, MAX_RESTART_BACKOFF)
+                        continue
+
+                    if self.observer is None:
+                        self.start_observer()
+                        started_at = time.monotonic()
+                        if failed_at is not None:
+                            self._record_recovery(failed_at)
+                            failed_at = None
+                    elif started_at and time.monotonic() - started_at > STABLE_AFTER:
+                        backoff = MIN_RESTART_BACKOFF
+                        started_at = None
+
+                except Exception as e:
+                    watcher_logger.error(f"Erreur dans le watcher, nouvel essai dans {backoff}s : {e}", exc_info=True)
+                    failed_at = failed_at or time.monotonic()
+                    self.stop_observer()
+                    self.stop_flag.wait(backoff)
+                    backoff = min(backoff * 2, MAX_RESTART_BACKOFF)
+                    continue
+
+                self.stop_flag.wait(1)
+
+            watcher_logger.info("Signal d'arrêt reçu, arrêt du watcher...")
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        """Demande d'arrêt propre du watcher."""
+        watcher_logger.info("Demande d'arrêt reçue pour le watcher")
+        self.stop_flag.set()
+
+    def shutdown(self):
+        self.stop_observer()
+        self.stop_resources()
+
+
+# --- Instance globale utilisée par le service ---
+supervisor = WatcherSupervisor()
+
+
+def start_watcher():
+    """Démarre le watcher supervisé (bloque jusqu'à stop_watcher())."""
+    supervisor.run()
+
+
+def cleanup_observer():
+    """Arrête proprement l'observer et les workers associés."""
+    supervisor.shutdown()
 
 
 def stop_watcher():
     """Demande d'arrêt propre du watcher."""
-    watcher_logger.info("Demande d'arrêt reçue pour le watcher")
-    stop_flag.set()
+    supervisor.stop()
 
 
 def is_watcher_running():
     """Retourne True si le watcher est actif."""
-    global observer
-    return observer is not None and observer.is_alive() and not stop_flag.is_set()
+    return supervisor.is_running()
 
 
 if __name__ == '__main__':
@@ -141,4 +401,3 @@ if __name__ == '__main__':
         watcher_logger.info("Interruption clavier détectée")
     finally:
         cleanup_observer()
-